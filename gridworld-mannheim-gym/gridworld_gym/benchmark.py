@@ -0,0 +1,195 @@
+"""
+Benchmarks for the hot paths of the simulator. Runs headless without Ray and prints the results as JSON.
+
+    python -m gridworld_gym.benchmark --episode-lengths 100 400 800 --densities 0.5 1 2 --output bench.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv, VectorGridWorldEnv
+from gridworld_gym.envs.layout import GRID_HEIGHT, GRID_WIDTH
+from gridworld_gym.envs.timetable import Departure, TIMETABLE
+
+
+def scale_timetable(timetable, density: float):
+    """
+    Scales the traffic of a timetable by dividing every headway by the density.
+    :param timetable: iterable of Departure
+    :param density: 1 keeps the timetable, 2 doubles the number of departures
+    :return: tuple of Departure
+    """
+    scaled = list()
+    for line, reverse, offset, headway in timetable:
+        headway = max(1, int(round(headway / density)))
+        scaled.append(Departure(line, reverse, offset % headway, headway))
+    return tuple(scaled)
+
+
+def _actions(action_space, steps: int, seed: int):
+    rng = np.random.RandomState(seed)
+    sizes = [space.n for space in action_space.spaces]
+    return [[int(rng.randint(size)) for size in sizes] for _ in range(steps)]
+
+
+def _summary(seconds):
+    seconds = np.asarray(seconds)
+    if not len(seconds):
+        return {"calls": 0}
+    return {"calls": int(len(seconds)), "mean_us": float(seconds.mean() * 1e6),
+            "p50_us": float(np.percentile(seconds, 50) * 1e6), "p99_us": float(np.percentile(seconds, 99) * 1e6),
+            "total_s": float(seconds.sum())}
+
+
+def bench_env(episode_length: int, density: float, repeats: int = 3, seed: int = 0):
+    """
+    Measures throughput, reset latency, per phase timings, render time and memory of GridWorldEnv.
+    :param episode_length: steps per episode
+    :param density: traffic density relative to the default timetable
+    :param repeats: number of episodes, the fastest one is reported as steps_per_sec
+    :param seed: seed of the actions and the simulator
+    :return: dict of results
+    """
+    env = GridWorldEnv({"timetable": scale_timetable(TIMETABLE, density)})
+    actions = _actions(env.action_space, episode_length, seed)
+
+    # Throughput and reset latency without instrumentation
+    episode_seconds, reset_seconds, trains = list(), list(), list()
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        env.reset(seed=seed + repeat)
+        reset_seconds.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for action in actions:
+            env.step(action)
+        episode_seconds.append(time.perf_counter() - start)
+        trains.append(len(env.trains))
+
+    # Per phase timings, queue depth and render
+    profiler = env.enable_profiling()
+    timings = {name: list() for name in profiler.phases}
+    env.reset(seed=seed)
+    render_seconds, rgb_seconds = list(), list()
+    for step, action in enumerate(actions):
+        _, _, _, info = env.step(action)
+        for name, phase in info["profile"]["phases"].items():
+            timings[name].append(phase["seconds"])
+        if step % 10 == 0:
+            start = time.perf_counter()
+            env.render()
+            render_seconds.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            env.render(mode="rgb_array")
+            rgb_seconds.append(time.perf_counter() - start)
+    profile = env.profile_summary()
+    env.enable_profiling(False)
+
+    # Memory: peak of the whole episode and transient allocations within a single step
+    env.reset(seed=seed)
+    tracemalloc.start()
+    step_peaks, blocks_before = list(), sys.getallocatedblocks()
+    for action in actions:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        env.step(action)
+        _, peak = tracemalloc.get_traced_memory()
+        step_peaks.append(peak - before)
+    _, episode_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks_after = sys.getallocatedblocks()
+
+    return {
+        "engine": "GridWorldEnv",
+        "episode_length": episode_length,
+        "density": density,
+        "map_size": [GRID_HEIGHT, GRID_WIDTH],
+        "steps_per_sec": episode_length / min(episode_seconds),
+        "reset": _summary(reset_seconds),
+        "phases": {name: _summary(seconds) for name, seconds in timings.items()},
+        "max_queue_depth": profile["max_queue_depth"],
+        "render": _summary(render_seconds),
+        "render_rgb_array": _summary(rgb_seconds),
+        "trains_at_end": trains,
+        "memory": {"episode_peak_bytes": int(episode_peak),
+                   "step_peak_bytes_mean": float(np.mean(step_peaks)),
+                   "step_peak_bytes_max": int(np.max(step_peaks)),
+                   "retained_blocks_per_step": (blocks_after - blocks_before) / episode_length},
+    }
+
+
+def bench_vector_env(num_envs: int, episode_length: int, density: float, seed: int = 0):
+    """
+    Measures the throughput of VectorGridWorldEnv.
+    :param num_envs: number of worlds stepped together
+    :param episode_length: steps per episode
+    :param density: traffic density relative to the default timetable
+    :param seed: seed of the actions and the simulator
+    :return: dict of results
+    """
+    env = VectorGridWorldEnv(num_envs, seed=seed, timetable=scale_timetable(TIMETABLE, density))
+    rng = np.random.RandomState(seed)
+    sizes = [space.n for space in env.single_action_space.spaces]
+    actions = np.stack([rng.randint(size, size=(episode_length, num_envs)) for size in sizes], axis=-1)
+    start = time.perf_counter()
+    env.reset()
+    reset_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for action in actions:
+        env.step(action)
+    seconds = time.perf_counter() - start
+    return {
+        "engine": "VectorGridWorldEnv",
+        "num_envs": num_envs,
+        "episode_length": episode_length,
+        "density": density,
+        "map_size": [GRID_HEIGHT, GRID_WIDTH],
+        "steps_per_sec": num_envs * episode_length / seconds,
+        "reset": _summary([reset_seconds]),
+    }
+
+
+def run(episode_lengths=(100, 400, 800), densities=(0.5, 1.0, 2.0), vector_envs=(16, 64), repeats: int = 3,
+        seed: int = 0):
+    """
+    Runs all benchmark cases.
+    :return: dict with meta data and one result per case
+    """
+    results = list()
+    for density in densities:
+        for episode_length in episode_lengths:
+            results.append(bench_env(episode_length, density, repeats, seed))
+        for num_envs in vector_envs:
+            results.append(bench_vector_env(num_envs, max(episode_lengths), density, seed))
+    return {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "numpy": np.__version__, "platform": platform.platform(), "seed": seed},
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the Mannheim grid world.")
+    parser.add_argument("--episode-lengths", type=int, nargs="+", default=[100, 400, 800])
+    parser.add_argument("--densities", type=float, nargs="+", default=[0.5, 1.0, 2.0])
+    parser.add_argument("--vector-envs", type=int, nargs="*", default=[16, 64])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args.episode_lengths, args.densities, args.vector_envs, args.repeats, args.seed)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,3 @@
-from gridworld_gym.envs.grid_world import GridWorldEnv
\ No newline at end of file
+from gridworld_gym.envs.grid_world import GridWorldEnv
+from gridworld_gym.envs.vector_grid_world import VectorGridWorldEnv
+from gridworld_gym.envs.subproc_vector_env import SubprocVectorGridWorldEnv
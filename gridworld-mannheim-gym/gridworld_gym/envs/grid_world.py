@@ -1,71 +1,438 @@
-import random
+import copy
 import time
 from abc import ABC
-from collections import deque
-from typing import Tuple, Union, Optional
+from typing import NamedTuple, Optional
 
 import gym
 import numpy as np
 from gym import spaces
 
-import sys
+from gridworld_gym.envs.layout import build_grid, build_train_grid, compile_grid, compile_route, GRID_HEIGHT, \
+    GRID_WIDTH, LINES, OBSERVATION_INDEX, OBSERVATION_PROBES, OBSERVATION_SLICES, SIGNAL_CLUSTERS, STOP
+from gridworld_gym.envs.profiling import NULL_PROFILER, PhaseProfiler
+from gridworld_gym.envs.rendering import GridRenderer
+from gridworld_gym.envs.statistics import PunctualityStats
+from gridworld_gym.envs.timetable import Timetable, TIMETABLE
+from gridworld_gym.envs.train import Train, TrainTable
+
+# The layout never changes, so it is built and compiled into tile codes once per process and shared read-only.
+# Every env only copies the signals, whose state is restored from the snapshot below on reset. Switches never change,
+# the routes of the lines are compiled with their switch positions below.
+GRID_TEMPLATE = build_grid()
+COMPILED_GRID = compile_grid(GRID_TEMPLATE)
+INITIAL_SIGNALS = tuple(GRID_TEMPLATE[y][x].status for y, x in COMPILED_GRID.signal_positions)
+# Index into the signal side table for every (cluster, action) pair, None for action 0 which turns the cluster red
+CLUSTER_SIGNALS = tuple((None,) + tuple(int(COMPILED_GRID.signal_index[y, x]) for y, x in positions)
+                        for positions in SIGNAL_CLUSTERS)
+CLUSTERED_SIGNALS = tuple(sorted(index for signals in CLUSTER_SIGNALS for index in signals[1:]))
+ACTION_SIZES = tuple(len(signals) for signals in CLUSTER_SIGNALS)
+# (x, y) of the tiles read by the observation, a train reaching one of them ends an action repeat with skip_to_decision
+PROBE_CELLS = tuple((x, y) for probes in OBSERVATION_PROBES.values() for y, x in probes)
+# Index into the signal side table of the signal behind every probe cell, probe i of a cluster is read for action i + 1
+PROBE_SIGNALS = tuple(signals[probe + 1] for signals, probes in zip(CLUSTER_SIGNALS, OBSERVATION_PROBES.values())
+                      for probe in range(len(probes)))
+# Every line is followed through the grid once, trains only advance an index along their route
+ROUTES = {key: compile_route(COMPILED_GRID, *line) for key, line in LINES.items()}
+ROUTE_KEYS = tuple(ROUTES)
+ROUTE_IDS = {id(route): index for index, route in enumerate(ROUTES.values())}
+# Station of every tile along a route, None if the tile is no stop, keyed by the id of the route
+ROUTE_STATIONS = {id(route): tuple(GRID_TEMPLATE[y][x].name if tile_code == STOP else None
+                                   for x, y, _, tile_code in route[:-1]) + (None,)
+                  for route in ROUTES.values()}
+# No train can leave the grid before it drove its route, so the first exit of an episode takes at least this long
+LONGEST_ROUTE = max(len(route) for route in ROUTES.values())
+
+# Random integers are drawn from the generator of an env in blocks of this size
+DRAW_BLOCK = 1024
+# Last world step of an episode and the lowest reward of one world step
+LAST_WORLD_STEP = 800
+MIN_STEP_REWARD = -100
+
+
+class IntegerDraws:
+    """
+    Endless stream of uniform random integers in [low, high] that are drawn from the generator a block at a time, so
+    every draw costs a single next() instead of a call into the generator.
+    """
+    __slots__ = ("rng", "low", "high", "block", "values", "position")
+
+    def __init__(self, rng: np.random.Generator, low: int, high: int, block: int = DRAW_BLOCK):
+        """
+        :param rng: numpy Generator
+        :param low: smallest value
+        :param high: largest value
+        :param block: number of values drawn at once
+        """
+        self.rng = rng
+        self.low = low
+        self.high = high
+        self.block = block
+        self.values = list()
+        self.position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        position = self.position
+        if position == len(self.values):
+            self.values = self.rng.integers(self.low, self.high, size=self.block, endpoint=True).tolist()
+            position = 0
+        self.position = position + 1
+        return self.values[position]
+
+    def get_state(self):
+        """
+        :return: tuple of the values that were drawn ahead but not used yet
+        """
+        return tuple(self.values[self.position:])
+
+    def set_state(self, state):
+        """
+        Restores the values drawn ahead from get_state.
+        :param state: tuple of int
+        :return: None
+        """
+        self.values = list(state)
+        self.position = 0
+
 
-from gridworld_gym.envs.helper import Signal, Switch, Stop
-from gridworld_gym.envs.train import Train
+def _freeze_rng(state: dict):
+    return state["bit_generator"], state["state"]["state"], state["state"]["inc"], state["has_uint32"], \
+        state["uinteger"]
+
+
+def _thaw_rng(state: tuple):
+    name, value, increment, has_uint32, uinteger = state
+    return {"bit_generator": name, "state": {"state": value, "inc": increment}, "has_uint32": has_uint32,
+            "uinteger": uinteger}
+
+
+class EnvState(NamedTuple):
+    """Complete mutable state of a GridWorldEnv, made of immutable values only, so it can be shared and pickled."""
+    world_step: int
+    signals: tuple  # status of every signal in row-major order
+    trains: tuple  # (x, y, direction, delay, line, route index in ROUTE_KEYS, index along the route, arrival delay)
+    timetable: tuple  # scheduled (world step, departure index) pairs
+    exit_delays: tuple
+    rng: tuple  # state of the PCG64 bit generator: (name, state, increment, has_uint32, uinteger)
+    start_delays: tuple  # values drawn ahead
+    dwell_times: tuple
+    gridlock: tuple = (0, 0, frozenset())  # steps with the same cycle, steps without an exit, tiles of the cycle
 
 
 class GridWorldEnv(gym.Env, ABC):
     """The schematic of Mannheim's central metro system. It is simplified into a gridworld and slightly altered."""
+    metadata = {"render.modes": ["human", "ansi", "rgb_array"]}
 
     def __init__(self, config=False):
         """
         Initializes all grid components with automatically generated components. Also sets the world steps to 0 as
         initial value.
+        :param config: optional dict (e.g. the RLlib env_config). With "flat_spaces": True the env exposes one flat
+        float32 Box observation and a MultiDiscrete action instead of the Dict observation and Tuple action.
+        "timetable" replaces the default departures with an iterable of (line, reverse, offset, headway) tuples.
+        "profile": True times every phase of step (see enable_profiling). "seed" seeds the random generator of the
+        env, which can also be reseeded with reset(seed=...). "action_repeat" applies every action for that many world
+        steps, "skip_to_decision": True ends the repetition early once a train reaches a probe cell of the
+        observation. "gridlock_termination": True ends the episode once a gridlock is detected: a cycle of trains that
+        wait for each other stayed for "cycle_patience" world steps (default 10) or no train left the grid for
+        "gridlock_patience" world steps (default 100), plus the length of the longest route before the first train of
+        the episode left. The last reward is then lowered by "gridlock_penalty", which
+        defaults to the lowest possible reward of all world steps that are cut off. "statistics": True collects the
+        punctuality of every line and station in env.statistics over all episodes (see statistics_summary), an
+        arrival is punctual with a delay of at most "on_time" world steps (default 3).
         """
         super(GridWorldEnv, self).__init__()
+        config = config or dict()
+        self.config = config
+        self.flat_spaces = bool(config.get("flat_spaces", False))
+        self.timetable = Timetable(config.get("timetable", TIMETABLE))
+        self.action_repeat = int(config.get("action_repeat", 1))
+        if self.action_repeat < 1:
+            raise ValueError(f"action_repeat has to be at least 1, got {self.action_repeat}.")
+        self.skip_to_decision = bool(config.get("skip_to_decision", False))
+        self.gridlock_termination = bool(config.get("gridlock_termination", False))
+        self.cycle_patience = int(config.get("cycle_patience", 10))
+        self.gridlock_patience = int(config.get("gridlock_patience", 100))
+        if self.cycle_patience < 1 or self.gridlock_patience < 1:
+            raise ValueError(f"cycle_patience and gridlock_patience have to be at least 1, got {self.cycle_patience} "
+                             f"and {self.gridlock_patience}.")
+        self.gridlock_penalty = config.get("gridlock_penalty")
         # Grid components
         self.grid = None
         self.train_grid = None
+        self.signals = None
+        # Table that stores the state of all trains in slots, the registry of active trains keyed by (x, y), the running
+        # sum of their delays and the delay per tile (-2 if there is no train) from which the observation is gathered
+        self.train_table = None
+        self.trains = None
+        self.total_delay = 0
+        self.delay_grid = None
+        # Delays of the trains that left the grid in this episode
+        self.exit_delays = list()
+        # Cycles of trains waiting for each other found in the last step
+        self.cycles = list()
+        # Longest chain of trains waiting for each other resolved in the last step
+        self.queue_depth = 0
+        # Reason of a detected gridlock ("cycle" or "stalled", None without gridlock) and the number of consecutive
+        # world steps with the same cycle and without a train leaving the grid
+        self.gridlock = None
+        self._cycle_steps = 0
+        self._stalled_steps = 0
+        self._cycle_tiles = frozenset()
         self.world_step = 0
+        # Start delays of new trains and dwell times at stops are drawn from the generator of this env
+        self.np_random = None
+        self.start_delays = None
+        self.dwell_times = None
+        self.seed(config.get("seed"))
         self._init_grid()
+        self.profiler = None
+        self._phase_timer = NULL_PROFILER
+        self._renderer = None
+        self.enable_profiling(bool(config.get("profile", False)))
+        self.statistics = PunctualityStats(int(config.get("on_time", 3))) if config.get("statistics") else None
 
         # Gym specific variables
         self.max_episode_steps = 400
-        self.state = dict()
-        self.action_space = spaces.Tuple(
-            [spaces.Discrete(5), spaces.Discrete(5), spaces.Discrete(4), spaces.Discrete(4), spaces.Discrete(4),
-             spaces.Discrete(4),
-             spaces.Discrete(3)])
-        self.observation_space = spaces.Dict({"signal_cluster_kubruecke": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                     shape=(4,), dtype=np.float32),
-                                              "signal_cluster_paradeplatz": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                       shape=(4,), dtype=np.float32),
-                                              "signal_cluster_handelshafen": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                        shape=(3,), dtype=np.float32),
-                                              "signal_cluster_nationaltheater": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                           shape=(3,),
-                                                                                           dtype=np.float32),
-                                              "signal_cluster_tattersall": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                      shape=(3,), dtype=np.float32),
-                                              "signal_cluster_kabruecke": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                     shape=(3,), dtype=np.float32),
-                                              "signal_cluster_wasserturm": spaces.Box(low=-np.inf, high=np.inf,
-                                                                                      shape=(2,), dtype=np.float32)})
-
-    def step(self, action):
+        self._observation = np.full(len(OBSERVATION_INDEX), -2, dtype=np.float32)
+        self.state = {key: self._observation[part] for key, part in OBSERVATION_SLICES.items()}
+        if self.flat_spaces:
+            self.action_space = spaces.MultiDiscrete(ACTION_SIZES)
+            self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=self._observation.shape,
+                                                dtype=np.float32)
+        else:
+            self.action_space = spaces.Tuple([spaces.Discrete(size) for size in ACTION_SIZES])
+            self.observation_space = spaces.Dict(
+                {key: spaces.Box(low=-np.inf, high=np.inf, shape=(part.stop - part.start,), dtype=np.float32)
+                 for key, part in OBSERVATION_SLICES.items()})
+
+    PHASES = ("_add_lines", "_update_signal", "_update_world", "_convert_to_observation_space")
+
+    def step(self, action, repeat: Optional[int] = None):
+        """
+        Advances the world with the given action. With an action repeat the same action is applied for up to repeat
+        world steps, with skip_to_decision the repetition stops as soon as a train reaches a probe cell of the
+        observation. Rewards of all world steps are summed up.
+        :param action: one action per signal cluster
+        :param repeat: maximum number of world steps, defaults to the action_repeat of the config
+        :return: observation, reward, done and info with the average delay after the last world step. If more than one
+        world step may be taken, info also holds the number of world steps and the mean of the average delay over them
+        as "repeat_average_delay". With profiling the timings of the phases are added as "profile".
+        """
+        repeat = self.action_repeat if repeat is None else repeat
         # print(action)
-        self._add_lines()
-        self._update_signal(action)
-        reward = self._update_world()
-        obs_state = self._convert_to_observation_space()
-        if self.world_step > 800:
+        probes = self._probe_trains() if repeat > 1 and self.skip_to_decision else None
+        self._run_phase(self._add_lines)
+        self._run_phase(self._update_signal, action)
+        reward = self._run_phase(self._update_world)
+        steps = 1
+        queue_depth = self.queue_depth
+        delay_sum = self._average_delay() if repeat > 1 else 0
+        while steps < repeat:
+            probes, decision = self._repeat_ends(probes)
+            if decision:
+                break
+            self._run_phase(self._add_lines)
+            reward += self._run_phase(self._update_world)
+            delay_sum += self._average_delay()
+            steps += 1
+            if self.queue_depth > queue_depth:
+                queue_depth = self.queue_depth
+        obs_state = self._run_phase(self._convert_to_observation_space)
+        if self.world_step > LAST_WORLD_STEP:
             done = True
         else:
             done = False
         avrg_delay = self._return_average_delay()
+        if repeat > 1:
+            avrg_delay["world_steps"] = steps
+            avrg_delay["repeat_average_delay"] = delay_sum / steps
+        if self.gridlock is not None:
+            reward, done = self._report_gridlock(reward, done, avrg_delay)
+        profile = self._phase_timer.end_step(steps, queue_depth)
+        if profile is not None:
+            avrg_delay["profile"] = profile
         # print(f"In Step {self.world_step} || Reward: {reward} || Average Delay: {avrg_delay}")
         return obs_state, reward, done, avrg_delay
 
+    def _run_phase(self, phase, *args):
+        """
+        Runs a phase of step and hands its wall time to the profiler, which does nothing while profiling is off.
+        :param phase: bound method of the env
+        :return: result of the phase
+        """
+        timer = self._phase_timer
+        trains = len(self.trains)
+        start = timer.clock()
+        result = phase(*args)
+        timer.record(phase.__name__, timer.clock() - start, trains)
+        return result
+
+    def _repeat_ends(self, probes):
+        """
+        :param probes: trains on the probe cells before the last world step, None without skip_to_decision
+        :return: trains on the probe cells now and True if an action repeat has to stop because the episode ended or
+        a decision is due
+        """
+        if self.world_step > LAST_WORLD_STEP or (self.gridlock_termination and self.gridlock is not None):
+            return probes, True
+        if probes is None:
+            return None, False
+        current = self._probe_trains()
+        return current, self._at_decision(probes, current, self.signals)
+
+    def _report_gridlock(self, reward, done: bool, info: dict):
+        """
+        Adds the reason of a detected gridlock to info and ends the episode with the penalty if gridlock_termination
+        is set.
+        :return: reward and done
+        """
+        info["gridlock"] = self.gridlock
+        if not self.gridlock_termination or done:
+            return reward, done
+        penalty = self.gridlock_penalty
+        if penalty is None:
+            penalty = -MIN_STEP_REWARD * (LAST_WORLD_STEP + 1 - self.world_step)
+        return reward - penalty, True
+
+    def gridlock_config(self):
+        """
+        :return: dict of the config entries of the gridlock termination, None if it is disabled
+        """
+        if not self.gridlock_termination:
+            return None
+        return {"gridlock_termination": True, "cycle_patience": self.cycle_patience,
+                "gridlock_patience": self.gridlock_patience, "gridlock_penalty": self.gridlock_penalty}
+
+    def _probe_trains(self):
+        """
+        :return: train on every probe cell read by the observation, None for free cells
+        """
+        trains = self.trains
+        return [trains.get(cell) for cell in PROBE_CELLS]
+
+    @staticmethod
+    def _at_decision(before, after, signals):
+        """
+        Trains queue on the probe cells most of the time, so only a train that newly reached a probe cell makes a
+        decision due, and only if the signal behind the cell is red. A train in front of a green signal passes anyway.
+        :param before: _probe_trains before a world step
+        :param after: _probe_trains after the world step
+        :param signals: signal side table of the env
+        :return: True if a train reached a probe cell in front of a red signal
+        """
+        for old, new, signal in zip(before, after, PROBE_SIGNALS):
+            if new is not None and new is not old and signals[signal].status == 1:
+                return True
+        return False
+
+    def _average_delay(self):
+        return self.total_delay / len(self.trains) if self.trains else 0
+
+    def seed(self, seed: Optional[int] = None):
+        """
+        Replaces the random generator of the env. Draws that were made ahead with the old generator are discarded.
+        :param seed: int or None for a seed from the operating system
+        :return: list with the seed
+        """
+        self.np_random = np.random.default_rng(seed)
+        self.start_delays = IntegerDraws(self.np_random, -3, 3, block=DRAW_BLOCK // 8)
+        self.dwell_times = IntegerDraws(self.np_random, 0, 2)
+        return [seed]
+
+    def get_state(self):
+        """
+        Captures the mutable state of the simulation: trains, signals, the timetable, the world step and the random
+        random generator. Layout, routes and spaces are shared and not part of the state.
+        :return: EnvState
+        """
+        table = self.train_table
+        trains = tuple((table.x[train.slot], table.y[train.slot], table.direction[train.slot],
+                        table.delay[train.slot], table.line[train.slot], ROUTE_IDS[id(table.route[train.slot])],
+                        table.route_index[train.slot], table.arrival_delay[train.slot])
+                       for train in self.trains.values())
+        return EnvState(world_step=self.world_step, signals=tuple(signal.status for signal in self.signals),
+                        trains=trains, timetable=self.timetable.get_state(), exit_delays=tuple(self.exit_delays),
+                        rng=_freeze_rng(self.np_random.bit_generator.state), start_delays=self.start_delays.get_state(),
+                        dwell_times=self.dwell_times.get_state(),
+                        gridlock=(self._cycle_steps, self._stalled_steps, self._cycle_tiles))
+
+    def set_state(self, state: EnvState):
+        """
+        Restores a state captured with get_state, also from another env.
+        :param state: EnvState
+        :return: observation of the restored state
+        """
+        self._reset_grid()
+        for signal, status in zip(self.signals, state.signals):
+            signal.status = status
+        table = self.train_table
+        for x, y, direction, delay, line, route, route_index, arrival_delay in state.trains:
+            train = table.spawn(ROUTES[ROUTE_KEYS[route]], line, delay)
+            table.x[train.slot], table.y[train.slot], table.direction[train.slot] = x, y, direction
+            table.route_index[train.slot] = route_index
+            table.arrival_delay[train.slot] = arrival_delay
+            self.add_train_to_grid(x, y, train)
+        self.world_step = state.world_step
+        self.timetable.set_state(state.timetable)
+        self.exit_delays = list(state.exit_delays)
+        self.np_random.bit_generator.state = _thaw_rng(state.rng)
+        self.start_delays.set_state(state.start_delays)
+        self.dwell_times.set_state(state.dwell_times)
+        self._cycle_steps, self._stalled_steps, self._cycle_tiles = state.gridlock
+        self._detect_gridlock()
+        return self._convert_to_observation_space()
+
+    def clone(self):
+        """
+        Creates an independent env with the same config and state. Only the mutable parts are built anew, the config,
+        the spaces and the layout are shared. Profiling, statistics and rendering start fresh.
+        :return: GridWorldEnv
+        """
+        env = copy.copy(self)
+        env._init_grid()
+        env.timetable = copy.copy(self.timetable)
+        env.seed()
+        env._observation = np.full(len(OBSERVATION_INDEX), -2, dtype=np.float32)
+        env.state = {key: env._observation[part] for key, part in OBSERVATION_SLICES.items()}
+        env._renderer = None
+        env.enable_profiling(self.profiler is not None)
+        if self.statistics is not None:
+            env.statistics = PunctualityStats(self.statistics.on_time)
+        env.set_state(self.get_state())
+        return env
+
+    def enable_profiling(self, enabled: bool = True):
+        """
+        Switches the per phase profiling of step on or off. While it is off the phases are handed to a NullProfiler
+        that does nothing. Switching it on starts with an empty profiler.
+        :param enabled: bool
+        :return: the PhaseProfiler or None
+        """
+        self.profiler = PhaseProfiler(self.PHASES) if enabled else None
+        self._phase_timer = self.profiler or NULL_PROFILER
+        return self.profiler
+
+    def statistics_summary(self):
+        """
+        Punctuality per line and station collected since the statistics were enabled, see PunctualityStats.summary.
+        :return: dict or None if the statistics are disabled
+        """
+        if self.statistics is None:
+            return None
+        return self.statistics.summary()
+
+    def profile_summary(self):
+        """
+        Cumulative timings of all profiled steps, see PhaseProfiler.summary.
+        :return: dict or None if profiling is disabled
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.summary()
+
     def reset(
             self,
             *,
@@ -74,411 +441,297 @@ class GridWorldEnv(gym.Env, ABC):
             options: Optional[dict] = None,
     ):
         # TODO: Call Conversion for Observation
-        self._init_grid()
+        if seed is not None:
+            self.seed(seed)
+        self._reset_grid()
+        self.timetable.reset()
         self.world_step = 0
         obs_state = self._convert_to_observation_space()
         return obs_state
 
     def render(self, mode='human', close=False):
-        # Render the environment to the screen
-        # TODO @Paula für Idee wie ich es erzeuge siehe unten __str__
-        output = ""
-        # iterate over all rows
-        for y, row in enumerate(self.grid):
-            # iterate over all elements in the row
-            for x, col in enumerate(row):
-                # if there is no train on the grid coordinate look into the normal grid
-                if self.train_grid[y][x] == 0:
-                    if col == 0:
-                        output += "  "
-                    elif col in ["-", "|", "/"]:
-                        output += 2 * col
-                    elif col == "\\":
-                        output += col * 2
-                    elif type(col) == Signal:
-                        output += "S" + str(col.status)
-                    elif type(col) == Switch:
-                        output += "W" + col.status_switched
-                    elif type(col) == Stop:
-                        output += "SP"  # col.name[:2]
-                # if there is a train on this grid coordinate print the train instead
-                else:
-                    output += str(self.train_grid[y][x].line_number) + self.train_grid[y][x].direction
-            output += "\n"
-        return output
+        """
+        Renders the grid. Only signals and trains are redrawn, the tracks come from a background that is drawn once.
+        :param mode: "human" or "ansi" for text with two characters per tile (trains as line number and direction,
+        signals as S and their status), "rgb_array" for an image
+        :param close: unused
+        :return: str or uint8 array of shape (height * tile size, width * tile size, 3)
+        """
+        if self._renderer is None:
+            self._renderer = GridRenderer(self)
+        if mode == "rgb_array":
+            return self._renderer.render_rgb()
+        return self._renderer.render_text()
 
     def add_train_to_grid(self, x: int, y: int, train: Train):
         """
-        Adds a train based on initial coordinates into the world by adding it to the train_grid. It has no logic to check
-        if a train already occupies the coordinate.
+        Adds a train based on initial coordinates into the world by adding it to the train_grid and the registry of
+        active trains. A train that already occupies the coordinate is replaced and leaves the world.
         :param x: integer between 0 and the length of a grid row
         :param y: integer between 0 and the height of the grid
-        :param train: train object that is to be placed
+        :param train: train handle that is to be placed
         :return: current grid step
         """
+        self.remove_train_from_grid(x, y)
         self.train_grid[y][x] = train
+        self.trains[(x, y)] = train
+        delay = self.train_table.delay[train.slot]
+        self.total_delay += delay
+        self.delay_grid[y * GRID_WIDTH + x] = delay
         return self.world_step
 
-    def _return_average_delay(self):
-        delay = 0
-        amount_trains = 0
-        for row in self.train_grid:
-            for col in row:
-                if type(col) == Train:
-                    delay += col.delay
-                    amount_trains += 1
+    def remove_train_from_grid(self, x: int, y: int, release: bool = True):
+        """
+        Removes whatever train occupies the coordinate from the train_grid and the registry of active trains.
+        :param x: integer between 0 and the length of a grid row
+        :param y: integer between 0 and the height of the grid
+        :param release: the train leaves the world and its slot in the train table is freed, False if it only moves
+        :return: None
+        """
+        train = self.trains.pop((x, y), None)
+        if train is not None:
+            self.train_grid[y][x] = 0
+            self.total_delay -= self.train_table.delay[train.slot]
+            self.delay_grid[y * GRID_WIDTH + x] = -2
+            if release:
+                self.train_table.release(train)
+
+    def add_delay(self, train: Train, delay: int):
+        """
+        Delays a train on the grid and keeps the running delay sum and the delay grid up to date.
+        :param train: train handle on the grid
+        :param delay: additional delay
+        :return: None
+        """
+        table, slot = self.train_table, train.slot
+        table.delay[slot] += delay
+        self.total_delay += delay
+        self.delay_grid[table.y[slot] * GRID_WIDTH + table.x[slot]] = table.delay[slot]
 
-        delay = (delay / amount_trains) if amount_trains else 0
+    def _return_average_delay(self):
+        delay = (self.total_delay / len(self.trains)) if self.trains else 0
 
         return {"average_delay": delay}
 
     def _convert_to_observation_space(self):
-        # Get delays at signal cluster 1 (Kurpfalzbrücke)
-        # Northern signal
-        if type(self.train_grid[0][19]) == Train:
-            delay1 = self.train_grid[0][19].delay
-        else:
-            delay1 = -2
-        # Southern signal
-        if type(self.train_grid[7][20]) == Train:
-            delay2 = self.train_grid[7][20].delay
-        else:
-            delay2 = -2
-        # Western signal
-        if type(self.train_grid[4][17]) == Train:
-            delay3 = self.train_grid[4][17].delay
-        else:
-            delay3 = -2
-        # Eastern signal
-        if type(self.train_grid[3][21]) == Train:
-            delay4 = self.train_grid[3][21].delay
-        else:
-            delay4 = -2
-        self.state["signal_cluster_kubruecke"] = np.array([delay1, delay2, delay3, delay4], dtype=np.float32)
-
-        # Get delays at signal cluster 2 (Paradeplatz)
-        # Northern Signal
-        if type(self.train_grid[8][19]) == Train:
-            delay1 = self.train_grid[8][19].delay
-        else:
-            delay1 = -2
-        # Southern signal
-        if type(self.train_grid[12][20]) == Train:
-            delay2 = self.train_grid[12][20].delay
-        else:
-            delay2 = -2
-        # Western signal
-        if type(self.train_grid[11][18]) == Train:
-            delay3 = self.train_grid[11][18].delay
-        else:
-            delay3 = -2
-        # Eastern signal
-        if type(self.train_grid[10][22]) == Train:
-            delay4 = self.train_grid[10][22].delay
-        else:
-            delay4 = -2
-        self.state["signal_cluster_paradeplatz"] = np.array([delay1, delay2, delay3, delay4], dtype=np.float32)
-
-        # Get delays at signal cluster 3 (Handelshafen)
-        # Northern Signal
-        if type(self.train_grid[9][2]) == Train:
-            delay1 = self.train_grid[9][2].delay
-        else:
-            delay1 = -2
-        # Western signal
-        if type(self.train_grid[11][1]) == Train:
-            delay2 = self.train_grid[11][1].delay
-        else:
-            delay2 = -2
-        # Eastern signal
-        if type(self.train_grid[10][5]) == Train:
-            delay3 = self.train_grid[10][5].delay
-        else:
-            delay3 = -2
-        self.state["signal_cluster_handelshafen"] = np.array([delay1, delay2, delay3], dtype=np.float32)
-
-        # Get delays at signal cluster 4 (Nationaltheater)
-        # Northern Signal
-        if type(self.train_grid[6][32]) == Train:
-            delay1 = self.train_grid[6][32].delay
-        else:
-            delay1 = -2
-        # Southern signal
-        if type(self.train_grid[10][33]) == Train:
-            delay2 = self.train_grid[10][33].delay
-        else:
-            delay2 = -2
-        # Eastern signal
-        if type(self.train_grid[7][35]) == Train:
-            delay3 = self.train_grid[7][35].delay
-        else:
-            delay3 = -2
-        self.state["signal_cluster_nationaltheater"] = np.array([delay1, delay2, delay3], dtype=np.float32)
-
-        # Get delays at signal cluster 5 (Tattersall)
-        # Northern Signal
-        if type(self.train_grid[12][32]) == Train:
-            delay1 = self.train_grid[12][32].delay
-        else:
-            delay1 = -2
-        # Southern signal
-        if type(self.train_grid[16][33]) == Train:
-            delay2 = self.train_grid[16][33].delay
-        else:
-            delay2 = -2
-        # Eastern signal
-        if type(self.train_grid[13][35]) == Train:
-            delay3 = self.train_grid[13][35].delay
-        else:
-            delay3 = -2
-        self.state["signal_cluster_tattersall"] = np.array([delay1, delay2, delay3], dtype=np.float32)
-
-        # Get delays at signal cluster 6 (Konrad-Adenauer-Brücke)
-        # Southern signal
-        if type(self.train_grid[22][23]) == Train:
-            delay1 = self.train_grid[22][23].delay
-        else:
-            delay1 = -2
-        # Western signal
-        if type(self.train_grid[20][20]) == Train:
-            delay2 = self.train_grid[20][20].delay
-        else:
-            delay2 = -2
-        # Eastern signal
-        if type(self.train_grid[19][24]) == Train:
-            delay3 = self.train_grid[19][24].delay
-        else:
-            delay3 = -2
-        self.state["signal_cluster_kabruecke"] = np.array([delay1, delay2, delay3], dtype=np.float32)
-
-        # Get delays at signal cluster 7 (Wasserturm)
-        # Southern signal
-        if type(self.train_grid[12][34]) == Train:
-            delay1 = self.train_grid[12][34].delay
-        else:
-            delay1 = -2
-        # Western signal
-        if type(self.train_grid[20][32]) == Train:
-            delay2 = self.train_grid[20][32].delay
-        else:
-            delay2 = -2
-        self.state["signal_cluster_wasserturm"] = np.array([delay1, delay2], dtype=np.float32)
+        """
+        Reads the delays of the trains on the probe tiles in front of every signal cluster (-2 if there is no train)
+        with a single gather into a preallocated buffer. Every call returns a copy of the buffer, so observations stay
+        valid after the next step. The price is one array of 22 floats and, without flat_spaces, a dict of seven views
+        per step. Callers that only need the latest observation, like the worker of SubprocVectorEnv, read the buffer
+        itself and copy nothing.
+        :return: dict of float32 arrays per signal cluster (views into one copy), or the flat array with flat_spaces
+        """
+        np.take(self.delay_grid, OBSERVATION_INDEX, out=self._observation)
+        observation = self._observation.copy()
+        if self.flat_spaces:
+            return observation
+        self.state = {key: observation[part] for key, part in OBSERVATION_SLICES.items()}
         return self.state
 
     def _init_grid(self):
         """
-        Sets all grids to their respective default.
+        Sets up the grids of this env from the shared template. It is only called once per env, reset restores the
+        mutable state with _reset_grid.
 
         :param: grid
         The grid is defined as a 2-dimensional list of element.
         A empty spot where no tracks exist is represented as 0. Vertical tracks - allowing vertical travel are
         represented by the string |.
         Horizontal tracks are given by '-'. Diagonal travel is represented by either \\ or /.
-        Signals, stops and switches are integrated as objects of their respective data types.
+        Signals, stops and switches are integrated as objects of their respective data types. Signals are copied for
+        every env, everything else is shared with the template.
 
         :param: train_grid
         The train grid is used to track the individual train objects on their path through the tracks. It has to be off
         the same dimensionality as the default grid.
 
+        :param: signals
+        Side table of the signals in row-major order, indexed like the signals of the compiled grid (see layout.py).
+
         :return: None
         """
-        self.grid = [  # Ausfahrt Kurpfalzbrücke
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Signal(), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Switch('/', '|'), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, '/', '-', '-', Stop(""), '-', '-', Stop(""), '-', '-', '-', Stop(""), '-', '-', '-', '-', '-',
-             '|', Switch('/', '|'), Signal(), '-', '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '-', 0, 0, 0, 0, 0,
-             0, 0],
-            [0, 0, '|', 0, '-', '-', Stop(""), '-', '-', Stop(""), '-', '-', '-', Stop(""), '-', '-', '-', Signal(),
-             Switch('/', '-'), '|', '|', '-', '-', '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '\\', '\\',
-             0, 0, 0, 0, 0, 0],
-            [0, 0, '|', '/', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Switch("/", "|"), 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, '\\', '\\', 0, 0, 0, 0, 0],
-            [0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Signal(), 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, Signal(), '\\', 0, 0, 0, 0],
-            [0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, Switch('\\', '|'), Switch('/', '|'), Switch('\\', '-'), Signal(), '-', '-'],  # Ausfahrt Nationaltheater
-            [0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, '|', '|', '-', '-', '-', '-'],  # Ausfahrt Nationaltheater
-            [0, 0, Signal(), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Signal(), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, Switch('/', '|'), Switch('/', '|'), 0, 0, 0, 0],
-            ['-', '-', Switch('\\', '-'), '-', Switch('\\', '-'), Signal(), '-', Stop(""), '-', '-', '-', Stop(""), '-',
-             '-', '-', '-', '-', '-', '-', Switch('\\', '|'), '|', Switch('\\', '-'), Signal(), '-', Stop(""), '-', '-',
-             '-', '-', '-', '-', Stop(""), '-', '-', '|', Signal(), 0, 0, 0, 0],  # Ausfahrt Handelshafen
-            ['-', Signal(), '-', '-', '-', '-', '-', Stop(""), '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '-',
-             Signal(), '|', '|', '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '-', Stop(""), Signal(),
-             Switch("\\", "-"), Switch('/', '|'),
-             Switch('\\', '|'), 0, 0, 0, 0],  # Ausfahrt Handelshafen
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Signal(), 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, Signal(), Signal(), 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             Switch('\\', '|'), Switch('/', '|'), Switch('\\', '-'), Signal(), Stop(""), '-'],  # Ausfahrt Tattersall
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             '|', '|', '-', '-', Stop(""), '-'],  # Ausfahrt Tattersall
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             '|', Switch('/', '|'), 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             '|', Signal(), 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             '|', '|', 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             '/', '|', 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '\\', 0, '\\', '-', '-', Switch('/', '-'),
-             Signal(), '-', Stop(""), '-', '-', '-', '-', '-', Stop(""), 0, '|', 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '-', Signal(), Switch('\\', '-'), '-',
-             Switch('\\', '-'), '-', '-', Stop(""), '-', '-', '-', '-', '-', Stop(""), '/', 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Switch('/', '-'), 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Stop(""), Signal(), 0, 0, 0, 0, 0, 0,
-             0,
-             0, 0, 0, 0, 0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0, 0, 0]
-        ]
-        self.train_grid = [
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0],
-            [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
-             0, 0, 0, 0]
-        ]
-
-    def _update_train(self, *args):
-        """
-        Recursive function to update all subsequent trains. It checks if there is a train object on the proposed new
-        coordinate, and it already moved on this grid step. If it hasn't moved the function update_train is called for
-        this train. The exit conditions are either there being no train on the track segment where the original train
-        object wants to move to or the train on the tile "ahead" already moved this step.
-        :param args: new x & y value of the train, the calculated reward in move function and the train object
-        :return: float reward
+        self.grid = [list(row) for row in GRID_TEMPLATE]
+        for y, x in COMPILED_GRID.signal_positions:
+            self.grid[y][x] = copy.copy(GRID_TEMPLATE[y][x])
+        self.train_grid = build_train_grid()
+        self.train_table = TrainTable(self)
+        self.trains = dict()
+        self.total_delay = 0
+        self.delay_grid = np.full(GRID_HEIGHT * GRID_WIDTH, -2, dtype=np.float32)
+        self.signals = [self.grid[y][x] for y, x in COMPILED_GRID.signal_positions]
+
+    def _reset_grid(self):
         """
-
-        if type(args[0]) == tuple:
-            # list unpacking of args
-            new_x, new_y, new_direction, reward, tile = args[0]
-            count = args[1]
-        else:
-            # print("\n\nArgs!", args)
-            new_x, new_y, new_direction, reward, tile = args[0][0].read_track()
-            count = args[0][1]
-            if count >= 15:
-                return 0
-
-        # check if train goes out-of-bounds and deletes it
-        if new_x > 39 or new_x < 0 or new_y < 0 or new_y > 23:
-            # remove train from train_grid
-            tile.grid.train_grid[tile.y][tile.x] = 0
-            # delete train object
-            del tile
-            return reward
-        else:
-            # calculates the new position of the train
-            expected_new_tile = self.train_grid[new_y][new_x]
-
-        # Change world step if condition 2
-        # check which condition applies to the new position
-        # Condition 1: Train on new position that hasn't moved on this step
-        if type(expected_new_tile) == Train:
-            if expected_new_tile.world_step != self.world_step:
-                if expected_new_tile != tile:
-                    # recursive call for the train on new position
-                    # print(
-                    #     f"Train on next field: {expected_new_tile.line_number} ({expected_new_tile.world_step}). Current "
-                    #     f"Train: {tile.line_number} ({expected_new_tile.world_step}) \nIn Step {self.world_step} | At "
-                    #     f"{new_x} || {new_y}")
-
-                    reward = self._update_train([expected_new_tile, count + 1])
-                    # move the original out of recursion train
-                    expected_new_tile.move(new_x, new_y, new_direction)
+        Restores the signal colours from the initial snapshot and removes all trains.
+        :return: None
+        """
+        for signal, status in zip(self.signals, INITIAL_SIGNALS):
+            signal.status = status
+        for x, y in self.trains:
+            self.train_grid[y][x] = 0
+            self.delay_grid[y * GRID_WIDTH + x] = -2
+        self.trains.clear()
+        self.train_table.clear()
+        self.total_delay = 0
+        self.exit_delays = list()
+        self.cycles = list()
+        self.gridlock = None
+        self._cycle_steps = 0
+        self._stalled_steps = 0
+        self._cycle_tiles = frozenset()
+
+    def _resolve_moves(self, moves):
+        """
+        Builds the "wants to move into" graph of one step. Every train points to the train on the tile it wants to
+        enter, so the graph consists of chains that end in a free tile, a border, a waiting train or a cycle. Each
+        chain is walked once without recursion and all of its trains move if its head moves. Trains in a cycle cannot
+        move and are stored in self.cycles. If two trains want to enter the same tile the first in row-major order
+        wins.
+        :param moves: (new_x, new_y, new_direction, reward, train) of every train in row-major order
+        :return: moves that can be executed, ordered so that every tile is vacated before it is entered, and the
+        number of blocked trains
+        """
+        can_move = dict()
+        ahead = dict()
+        claimed = set()
+        order = list()
+        blocked = 0
+        for move in moves:
+            new_x, new_y, _, _, train = move
+            if new_x > GRID_WIDTH - 1 or new_x < 0 or new_y < 0 or new_y > GRID_HEIGHT - 1:
+                # leaves the grid
+                can_move[train] = move
+                order.append(move)
+            elif new_x == train.x and new_y == train.y:
+                # waits at a red signal
+                can_move[train] = None
+            elif (new_x, new_y) in claimed:
+                can_move[train] = None
+                blocked += 1
+            else:
+                claimed.add((new_x, new_y))
+                occupant = self.trains.get((new_x, new_y))
+                if occupant is None:
+                    can_move[train] = move
+                    order.append(move)
                 else:
-                    reward = 0
-                return reward
-            # Condition 2: Train on new position that has already moved this step
-            elif expected_new_tile.world_step == self.world_step:
-                tile.world_step = self.world_step
-                expected_new_tile.move(new_x, new_y, new_direction)
-                return reward - 1
-        # Condition 3: Nothing on the new position
-        else:
-            tile.move(new_x, new_y, new_direction)
-            return reward + 0
+                    ahead[train] = (occupant, move)
+
+        self.cycles = list()
+        self.queue_depth = 0
+        for train in ahead:
+            path = list()
+            on_path = set()
+            while train not in can_move:
+                if train in on_path:
+                    self.cycles.append(path[path.index(train):])
+                    break
+                on_path.add(train)
+                path.append(train)
+                train = ahead[train][0]
+            if len(path) > self.queue_depth:
+                self.queue_depth = len(path)
+            # the whole chain behind a moving train moves, everything behind a waiting train or a cycle waits
+            head_moves = train in can_move and can_move[train] is not None
+            for waiting in reversed(path):
+                move = ahead[waiting][1]
+                if head_moves:
+                    can_move[waiting] = move
+                    order.append(move)
+                else:
+                    can_move[waiting] = None
+                    blocked += 1
+        return order, blocked
 
     def _update_world(self):
+        """
+        Updates every active train once. All trains read their track in row-major order, afterwards the resolver
+        decides which of them can move and the moves are executed head of queue first.
+        :return: float reward
+        """
         self.world_step += 1
-        reward = 0
-        for row in self.train_grid:
-            for tile in row:
-                if type(tile) == Train and tile.world_step != self.world_step:
-                    reward += self._update_train(tile.read_track(), 0)
-        reward = max(reward, -100)
+        trains = [self.trains[position] for position in sorted(self.trains, key=lambda position: position[::-1])]
+        order, blocked = self._resolve_moves([train.read_track() for train in trains])
+        reward = -blocked
+        exits = len(self.exit_delays)
+        if self.statistics is not None:
+            self._record_stops(order)
+        for new_x, new_y, new_direction, train_reward, train in order:
+            if new_x > GRID_WIDTH - 1 or new_x < 0 or new_y < 0 or new_y > GRID_HEIGHT - 1:
+                # remove train from train_grid
+                self.exit_delays.append(train.delay)
+                self.remove_train_from_grid(train.x, train.y)
+            else:
+                train.move(new_x, new_y, new_direction)
+            reward += train_reward
+        self._track_gridlock(len(self.exit_delays) - exits)
+        reward = max(reward, MIN_STEP_REWARD)
         return reward
 
+    def _record_stops(self, moves):
+        """
+        Adds the arrivals at and departures from stations and the exits of the moves of a world step to the
+        statistics. Has to be called before the moves are executed.
+        :param moves: moves as returned by _resolve_moves
+        :return: None
+        """
+        statistics, table = self.statistics, self.train_table
+        for new_x, new_y, _, _, train in moves:
+            slot = train.slot
+            if new_x > GRID_WIDTH - 1 or new_x < 0 or new_y < 0 or new_y > GRID_HEIGHT - 1:
+                statistics.exit(table.line[slot], table.delay[slot])
+                continue
+            stations = ROUTE_STATIONS[id(table.route[slot])]
+            index = table.route_index[slot]
+            if stations[index] is not None:
+                statistics.departure(table.line[slot], stations[index], table.delay[slot] - table.arrival_delay[slot])
+            if stations[index + 1] is not None:
+                table.arrival_delay[slot] = table.delay[slot]
+                statistics.arrival(table.line[slot], stations[index + 1], table.delay[slot])
+
+    def _track_gridlock(self, exits: int):
+        """
+        Follows the wait-for graph of the resolver over the world steps. A cycle of trains that wait for each other
+        can only be broken by a new train that replaces one of them, so the world steps in which a cycle stays on the
+        same tiles are counted. A jam without a cycle still lets new trains drive up to its end, so the network counts
+        as stalled while trains are on the grid but none of them leaves it. Until the first train leaves, the trains
+        are still driving their routes, so the patience is extended by the longest route.
+        :param exits: number of trains that left the grid in the world step
+        :return: None
+        """
+        if self.cycles:
+            tiles = frozenset((train.x, train.y) for cycle in self.cycles for train in cycle)
+            self._cycle_steps = self._cycle_steps + 1 if tiles == self._cycle_tiles else 1
+            self._cycle_tiles = tiles
+        elif self._cycle_steps:
+            self._cycle_steps = 0
+            self._cycle_tiles = frozenset()
+        self._stalled_steps = self._stalled_steps + 1 if self.trains and not exits else 0
+        if self._cycle_steps or self._stalled_steps or self.gridlock is not None:
+            self._detect_gridlock()
+
+    def _detect_gridlock(self):
+        if self._cycle_steps >= self.cycle_patience:
+            self.gridlock = "cycle"
+        elif self._stalled_steps >= self.gridlock_patience + (0 if self.exit_delays else LONGEST_ROUTE):
+            self.gridlock = "stalled"
+        else:
+            self.gridlock = None
+
     def _update_signal(self, action_list):
         """
+        Turns all clustered signals red and the signal selected by the action of each cluster green.
         [0,0,2,3,4,3,2]
-        :param action_list: list of 7 integers
+        :param action_list: list or array of 7 integers
         :return:
         """
-        # Get delays at signal cluster 1 (Kurpfalzbrücke)
-        # Northern signal
-        signal_positions = [[self.grid[1][19], self.grid[6][20], self.grid[4][17], self.grid[3][21]],
-                            [self.grid[9][19], self.grid[12][20], self.grid[11][18], self.grid[10][22]],
-                            [self.grid[9][2], self.grid[11][1], self.grid[10][5]],
-                            [self.grid[6][34], self.grid[10][35], self.grid[7][37]],
-                            [self.grid[12][34], self.grid[16][35], self.grid[13][37]],
-                            [self.grid[22][24], self.grid[20][21], self.grid[19][25]],
-                            [self.grid[12][35], self.grid[11][32]]]
-        for cnt, element in enumerate(action_list):
-            for signal in signal_positions[cnt]:
-                signal.turn_red()
+        signals = self.signals
+        for index in CLUSTERED_SIGNALS:
+            signals[index].turn_red()
+        for cluster, element in zip(CLUSTER_SIGNALS, action_list):
             if element != 0:
-                signal_positions[cnt][element - 1].turn_green()
+                signals[cluster[element]].turn_green()
         return None
 
     def _create_line(self, line_number: int, reverse: bool):
@@ -486,105 +739,24 @@ class GridWorldEnv(gym.Env, ABC):
         Creates a train line based on the line number and its tracking direction.
         :param line_number:
         :param reverse:
-        :param grid:
         :return:
         """
-        delay = random.randint(-3, 3)
-        if line_number == 1:
-            # if reverse is False:
-            # from TAT
-            switches = deque(["-", "/", "-", "|", "|"])
-            line = Train(start_x=39, start_y=13, direction="<", grid=self, switches=switches, delay=delay, line=1)
-            # else:
-            #     # from KUB
-            #     switches = deque(["|", "|", "-", "-", "/"])
-            #     line = Train(start_x=19, start_y=0, direction="v", grid=self, switches=switches, delay=delay, line=1)
-
-        elif line_number == 2:
-            if reverse is False:
-                # from NAT
-                switches = deque(["-", "/", "/", "-", "-", "\\", "/"])
-                line = Train(start_x=39, start_y=8, direction="<", grid=self, switches=switches, delay=delay, line=2)
-            else:
-                # from KUB
-                switches = deque(["/", "\\", "-", "/", "/"])
-                line = Train(start_x=19, start_y=0, direction="v", grid=self, switches=switches, delay=delay, line=2)
-
-        # Line 3 skipped because of grid architecture
-
-        elif line_number == 4:
-            if reverse is False:
-                # from KAB
-                switches = deque(["/", "|", "|", "\\", "\\", "|", "|"])
-                line = Train(start_x=24, start_y=23, direction="^", grid=self, switches=switches, delay=delay, line=4)
-            else:
-                # from KUB
-                switches = deque(["|", "|", "\\"])
-                line = Train(start_x=19, start_y=0, direction="v", grid=self, switches=switches, delay=delay, line=4)
-
-        elif line_number == 5:
-            if reverse is False:
-                # from KUB
-                switches = deque(["|", "|", "|", "-", "-", "|", "|", "|", "/"])
-                line = Train(start_x=19, start_y=0, direction="v", grid=self, switches=switches, delay=delay, line=5)
-            else:
-                # from NAT
-                switches = deque(["-", "/", "|", "|", "|", "-", "|"])
-                line = Train(start_x=39, start_y=7, direction="<", grid=self, switches=switches, delay=delay, line=5)
-
-        elif line_number == 6:
-            if reverse is False:
-                # from TAT
-                switches = deque(["\\", "\\", "-", "|", "-", "-", "-"])
-                line = Train(start_x=39, start_y=13, direction="<", grid=self, switches=switches, delay=delay, line=6)
-            else:
-                # from HHF
-                switches = deque(["\\", "\\"])
-                line = Train(start_x=0, start_y=11, direction=">", grid=self, switches=switches, delay=delay, line=6)
-
-        elif line_number == 7:
-            if reverse is False:
-                # from NAT
-                switches = deque(["\\", "/", "|", "|", "\\"])
-                line = Train(start_x=39, start_y=8, direction="<", grid=self, switches=switches, delay=delay, line=7)
-            else:
-                # from KAB
-                switches = deque(["|", "\\", "/", "\\"])
-                line = Train(start_x=24, start_y=23, direction="^", grid=self, switches=switches, delay=delay, line=7)
-
-        else:
-            raise NotImplemented("Line number is not implemented! Only lines 1,2,4,5,6,7 are implemented.")
-
+        delay = next(self.start_delays)
+        try:
+            route = ROUTES[(line_number, reverse)]
+        except KeyError:
+            raise NotImplementedError("Line number is not implemented! Only lines 1,2,4,5,6,7 are implemented.")
+        line = self.train_table.spawn(route, line_number, delay)
+        self.add_train_to_grid(line.x, line.y, line)
         return line
 
     def _add_lines(self):
-        if self.world_step % 20 == 0:
-            pass
-
-        elif self.world_step % 20 == 1:
-            self._create_line(6, False)
-
-        elif self.world_step % 20 == 2:
-            self._create_line(4, False)
-            self._create_line(4, True)
-
-        elif self.world_step % 20 == 3:
-            self._create_line(1, True)
-
-        elif self.world_step % 20 == 4:
-            self._create_line(1, False)
-
-        elif self.world_step % 20 == 5:
-            # self._create_line(5, True)
-            pass
-
-        elif self.world_step % 20 == 8:
-            # self._create_line(2, True)
-            self._create_line(7, True)
-
-        elif self.world_step % 20 == 9:
-            self._create_line(6, True)
-            self._create_line(5, False)
+        """
+        Creates the trains of all departures that are due at the current world step.
+        :return: None
+        """
+        for departure in self.timetable.due(self.world_step):
+            self._create_line(departure.line, departure.reverse)
 
     # def __str__(self):
     #     """
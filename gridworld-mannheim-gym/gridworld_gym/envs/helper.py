@@ -1,5 +1,6 @@
 class Signal:
     """A signal allows the train to be stopped on the current segment for ordering and preventing crashes."""
+    __slots__ = ("status",)
 
     def __init__(self):
         """
@@ -7,6 +8,11 @@ class Signal:
         """
         self.status = 0
 
+    def __copy__(self):
+        signal = Signal()
+        signal.status = self.status
+        return signal
+
     def turn_red(self):
         """
         Switches the status of the signal to 1 (red light)
@@ -24,6 +30,7 @@ class Signal:
 
 class Switch:
     """A switch that replaces a track segment and allows the train to move in different directions."""
+    __slots__ = ("status", "status_switched", "default")
 
     def __init__(self, alternative: str, default: str):
         """
@@ -36,20 +43,10 @@ class Switch:
         self.status_switched = alternative
         self.default = default
 
-    def change_status(self, status_updated):
-        """
-        Switches Status between the default state and the activated state
-        :param status_updated: new state for switch, is validated against base values
-        :return: None
-        """
-        # if status_updated not in [self.default, self.status_switched]:
-        #     raise Exception(f"Switch forced to switch to wrong status! Was given {status_updated} but can only accept "
-        #                     f"{self.default, self.status_switched}")
-        self.status = status_updated
-
 
 class Stop:
     """A stop is defined as a station on the network."""
+    __slots__ = ("name",)
 
     def __init__(self, name: str):
         """
@@ -0,0 +1,277 @@
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from gridworld_gym.envs.helper import Signal, Switch, Stop
+
+GRID_HEIGHT = 24
+GRID_WIDTH = 40
+
+# Directions are encoded clockwise starting north, so that the index can be used for numpy lookups
+DIRECTIONS = ("^", ">", "v", "<")
+DIRECTION_INDEX = {symbol: index for index, symbol in enumerate(DIRECTIONS)}
+
+# Tile codes of the compiled grid
+EMPTY = 0
+HORIZONTAL = 1
+VERTICAL = 2
+CURVE_LEFT = 3
+CURVE_RIGHT = 4
+STOP = 5
+SIGNAL = 6
+SWITCH = 7
+
+SYMBOL_CODES = {0: EMPTY, "-": HORIZONTAL, "|": VERTICAL, "/": CURVE_LEFT, "\\": CURVE_RIGHT}
+
+
+def _build_transitions():
+    """
+    Builds the movement table indexed by (tile_code, direction). Every entry holds (dx, dy, new_direction).
+    Straight tiles, stops, signals and empty tiles keep the direction of the train. Curves turn the train and move it
+    diagonally. Red signals are not part of the table, the train reads their status itself.
+    :return: int8 array of shape (8, 4, 3)
+    """
+    straight = {"^": (0, -1, "^"), ">": (1, 0, ">"), "v": (0, 1, "v"), "<": (-1, 0, "<")}
+    curve_left = {"^": (1, -1, ">"), ">": (1, -1, "^"), "v": (-1, 1, "<"), "<": (-1, 1, "v")}
+    curve_right = {"^": (-1, -1, "<"), ">": (1, 1, "v"), "v": (1, 1, ">"), "<": (-1, -1, "^")}
+    per_code = {EMPTY: straight, HORIZONTAL: straight, VERTICAL: straight, CURVE_LEFT: curve_left,
+                CURVE_RIGHT: curve_right, STOP: straight, SIGNAL: straight, SWITCH: straight}
+
+    table = np.zeros((len(per_code), len(DIRECTIONS), 3), dtype=np.int8)
+    for code, moves in per_code.items():
+        for direction, (dx, dy, new_direction) in moves.items():
+            table[code, DIRECTION_INDEX[direction]] = (dx, dy, DIRECTION_INDEX[new_direction])
+    return table
+
+
+TRANSITIONS = _build_transitions()
+TRANSITIONS.setflags(write=False)
+
+# Same table for the object model: MOVES[tile_code][direction symbol] -> (dx, dy, new direction symbol)
+MOVES = tuple({DIRECTIONS[direction]: (int(dx), int(dy), DIRECTIONS[new_direction])
+               for direction, (dx, dy, new_direction) in enumerate(moves)} for moves in TRANSITIONS)
+
+# Start coordinates, direction and switch symbols of every line. Line 1 only runs from Tattersall, the reverse
+# direction from Kurpfalzbrücke is disabled because of the grid architecture. Line 3 does not exist.
+LINES = {
+    (1, False): (39, 13, "<", ("-", "/", "-", "|", "|")),  # from TAT
+    (1, True): (39, 13, "<", ("-", "/", "-", "|", "|")),  # from TAT
+    (2, False): (39, 8, "<", ("-", "/", "/", "-", "-", "\\", "/")),  # from NAT
+    (2, True): (19, 0, "v", ("/", "\\", "-", "/", "/")),  # from KUB
+    (4, False): (24, 23, "^", ("/", "|", "|", "\\", "\\", "|", "|")),  # from KAB
+    (4, True): (19, 0, "v", ("|", "|", "\\")),  # from KUB
+    (5, False): (19, 0, "v", ("|", "|", "|", "-", "-", "|", "|", "|", "/")),  # from KUB
+    (5, True): (39, 7, "<", ("-", "/", "|", "|", "|", "-", "|")),  # from NAT
+    (6, False): (39, 13, "<", ("\\", "\\", "-", "|", "-", "-", "-")),  # from TAT
+    (6, True): (0, 11, ">", ("\\", "\\")),  # from HHF
+    (7, False): (39, 8, "<", ("\\", "/", "|", "|", "\\")),  # from NAT
+    (7, True): (24, 23, "^", ("|", "\\", "/", "\\")),  # from KAB
+}
+
+# Coordinates (y, x) of the tiles in front of each signal cluster that are read for the observation
+OBSERVATION_PROBES = OrderedDict([
+    ("signal_cluster_kubruecke", ((0, 19), (7, 20), (4, 17), (3, 21))),
+    ("signal_cluster_paradeplatz", ((8, 19), (12, 20), (11, 18), (10, 22))),
+    ("signal_cluster_handelshafen", ((9, 2), (11, 1), (10, 5))),
+    ("signal_cluster_nationaltheater", ((6, 32), (10, 33), (7, 35))),
+    ("signal_cluster_tattersall", ((12, 32), (16, 33), (13, 35))),
+    ("signal_cluster_kabruecke", ((22, 23), (20, 20), (19, 24))),
+    ("signal_cluster_wasserturm", ((12, 34), (20, 32))),
+])
+
+# Flat indices y * GRID_WIDTH + x of all probes and the slice of the flat observation that belongs to each cluster
+OBSERVATION_INDEX = np.array([y * GRID_WIDTH + x for probes in OBSERVATION_PROBES.values() for y, x in probes],
+                             dtype=np.intp)
+OBSERVATION_INDEX.setflags(write=False)
+
+
+def _build_observation_slices():
+    slices = OrderedDict()
+    start = 0
+    for key, probes in OBSERVATION_PROBES.items():
+        slices[key] = slice(start, start + len(probes))
+        start += len(probes)
+    return slices
+
+
+OBSERVATION_SLICES = _build_observation_slices()
+
+# Coordinates (y, x) of the signals controlled by each entry of the action tuple
+SIGNAL_CLUSTERS = (
+    ((1, 19), (6, 20), (4, 17), (3, 21)),
+    ((9, 19), (12, 20), (11, 18), (10, 22)),
+    ((9, 2), (11, 1), (10, 5)),
+    ((6, 34), (10, 35), (7, 37)),
+    ((12, 34), (16, 35), (13, 37)),
+    ((22, 24), (20, 21), (19, 25)),
+    ((12, 35), (11, 32)),
+)
+
+
+# Names of the stations by the columns of their stops, both platforms of a station share the name. Like the grid the
+# positions are a schematic of the real network.
+STATIONS = OrderedDict([
+    ((3, 6), "Jungbusch"), ((4, 6), "Jungbusch"),
+    ((3, 9), "Dalbergstraße"), ((4, 9), "Dalbergstraße"),
+    ((3, 13), "Abendakademie"), ((4, 13), "Abendakademie"),
+    ((3, 26), "Alte Feuerwache"), ((4, 26), "Alte Feuerwache"),
+    ((10, 7), "Rheinstraße"), ((11, 7), "Rheinstraße"),
+    ((10, 11), "Rathaus"), ((11, 11), "Rathaus"),
+    ((10, 24), "Strohmarkt"), ((11, 24), "Strohmarkt"),
+    ((10, 31), "Wasserturm"), ((11, 31), "Wasserturm"),
+    ((13, 38), "Tattersall"), ((14, 38), "Tattersall"),
+    ((19, 27), "Universität"), ((20, 27), "Universität"),
+    ((19, 33), "Hauptbahnhof"), ((20, 33), "Hauptbahnhof"),
+    ((22, 23), "Schloss"),
+])
+
+
+class CompiledGrid(NamedTuple):
+    """Integer representation of a grid together with the side tables for its stateful tiles."""
+    tiles: np.ndarray  # (height, width) tile codes
+    signal_index: np.ndarray  # (height, width) index into signal_positions, -1 if the tile is no signal
+    switch_index: np.ndarray  # (height, width) index into switch_positions, -1 if the tile is no switch
+    signal_positions: tuple  # (y, x) of every signal in row-major order
+    switch_positions: tuple  # (y, x) of every switch in row-major order
+    switch_defaults: tuple  # default symbol of every switch
+    stop_positions: tuple  # (y, x) of every stop in row-major order
+
+
+def compile_grid(grid) -> CompiledGrid:
+    """
+    Compiles a grid of symbols and objects (see build_grid) into integer tile codes. Signals, switches and stops get
+    their own running index so that their state can be kept in flat arrays.
+    :param grid: 2-dimensional list as returned by build_grid
+    :return: CompiledGrid
+    """
+    height, width = len(grid), len(grid[0])
+    tiles = np.zeros((height, width), dtype=np.int8)
+    signal_index = np.full((height, width), -1, dtype=np.int16)
+    switch_index = np.full((height, width), -1, dtype=np.int16)
+    signals, switches, switch_defaults, stops = [], [], [], []
+
+    for y, row in enumerate(grid):
+        for x, col in enumerate(row):
+            if type(col) == Signal:
+                tiles[y, x] = SIGNAL
+                signal_index[y, x] = len(signals)
+                signals.append((y, x))
+            elif type(col) == Switch:
+                tiles[y, x] = SWITCH
+                switch_index[y, x] = len(switches)
+                switches.append((y, x))
+                switch_defaults.append(col.default)
+            elif type(col) == Stop:
+                tiles[y, x] = STOP
+                stops.append((y, x))
+            else:
+                tiles[y, x] = SYMBOL_CODES[col]
+
+    return CompiledGrid(tiles, signal_index, switch_index, tuple(signals), tuple(switches), tuple(switch_defaults),
+                        tuple(stops))
+
+
+def compile_route(compiled: CompiledGrid, start_x: int, start_y: int, direction: str, switches) -> tuple:
+    """
+    Follows a line through the compiled grid and records every tile it passes. Switches are resolved with the
+    switch symbols of the line in the order they are reached, once the symbols are used up the default of the switch
+    is taken. The route is only valid while trains move along it without skipping tiles, which is what Train does.
+    :param compiled: CompiledGrid of the map
+    :param start_x: x coordinate where the line enters the grid
+    :param start_y: y coordinate where the line enters the grid
+    :param direction: direction symbol in which the line enters the grid
+    :param switches: switch symbols of the line
+    :return: tuple of (x, y, direction, tile_code) per tile. The last entry lies outside the grid and marks the exit.
+    """
+    height, width = compiled.tiles.shape
+    symbols = list(switches)
+    route = list()
+    x, y = start_x, start_y
+    while 0 <= x < width and 0 <= y < height:
+        if len(route) > 4 * height * width:
+            raise ValueError(f"Route starting at {start_x}|{start_y} does not leave the grid.")
+        tile_code = int(compiled.tiles[y, x])
+        route.append((x, y, direction, tile_code))
+        if tile_code == SWITCH:
+            symbol = symbols.pop(0) if symbols else compiled.switch_defaults[compiled.switch_index[y, x]]
+            tile_code = SYMBOL_CODES[symbol]
+        dx, dy, direction = MOVES[tile_code][direction]
+        x, y = x + dx, y + dy
+    route.append((x, y, direction, EMPTY))
+    return tuple(route)
+
+
+def build_train_grid():
+    """
+    Creates an empty train grid of the same dimensionality as the default grid.
+    :return: 2-dimensional list of zeros
+    """
+    return [[0] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+
+
+def build_grid():
+    """
+    Creates the schematic of Mannheim's central metro system with fresh signal, switch and stop objects. The stops are
+    named after STATIONS.
+    :return: 2-dimensional list of symbols and objects
+    """
+    grid = [  # Ausfahrt Kurpfalzbrücke
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Signal(), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Switch('/', '|'), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, '/', '-', '-', Stop(""), '-', '-', Stop(""), '-', '-', '-', Stop(""), '-', '-', '-', '-', '-',
+         '|', Switch('/', '|'), Signal(), '-', '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '-', 0, 0, 0, 0, 0,
+         0, 0],
+        [0, 0, '|', 0, '-', '-', Stop(""), '-', '-', Stop(""), '-', '-', '-', Stop(""), '-', '-', '-', Signal(),
+         Switch('/', '-'), '|', '|', '-', '-', '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '\\', '\\',
+         0, 0, 0, 0, 0, 0],
+        [0, 0, '|', '/', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Switch("/", "|"), 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, '\\', '\\', 0, 0, 0, 0, 0],
+        [0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Signal(), 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, Signal(), '\\', 0, 0, 0, 0],
+        [0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, Switch('\\', '|'), Switch('/', '|'), Switch('\\', '-'), Signal(), '-', '-'],  # Ausfahrt Nationaltheater
+        [0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, '|', '|', '-', '-', '-', '-'],  # Ausfahrt Nationaltheater
+        [0, 0, Signal(), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Signal(), '|', 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, Switch('/', '|'), Switch('/', '|'), 0, 0, 0, 0],
+        ['-', '-', Switch('\\', '-'), '-', Switch('\\', '-'), Signal(), '-', Stop(""), '-', '-', '-', Stop(""), '-',
+         '-', '-', '-', '-', '-', '-', Switch('\\', '|'), '|', Switch('\\', '-'), Signal(), '-', Stop(""), '-', '-',
+         '-', '-', '-', '-', Stop(""), '-', '-', '|', Signal(), 0, 0, 0, 0],  # Ausfahrt Handelshafen
+        ['-', Signal(), '-', '-', '-', '-', '-', Stop(""), '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '-',
+         Signal(), '|', '|', '-', '-', '-', Stop(""), '-', '-', '-', '-', '-', '-', Stop(""), Signal(),
+         Switch("\\", "-"), Switch('/', '|'),
+         Switch('\\', '|'), 0, 0, 0, 0],  # Ausfahrt Handelshafen
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Signal(), 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, Signal(), Signal(), 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         Switch('\\', '|'), Switch('/', '|'), Switch('\\', '-'), Signal(), Stop(""), '-'],  # Ausfahrt Tattersall
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         '|', '|', '-', '-', Stop(""), '-'],  # Ausfahrt Tattersall
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         '|', Switch('/', '|'), 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         '|', Signal(), 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         '|', '|', 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         '/', '|', 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '\\', 0, '\\', '-', '-', Switch('/', '-'),
+         Signal(), '-', Stop(""), '-', '-', '-', '-', '-', Stop(""), 0, '|', 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '-', Signal(), Switch('\\', '-'), '-',
+         Switch('\\', '-'), '-', '-', Stop(""), '-', '-', '-', '-', '-', Stop(""), '/', 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', Switch('/', '-'), 0, 0, 0, 0, 0,
+         0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, Stop(""), Signal(), 0, 0, 0, 0, 0, 0,
+         0,
+         0, 0, 0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, '|', '|', 0, 0, 0, 0, 0, 0, 0, 0, 0,
+         0, 0, 0, 0, 0, 0]
+    ]
+    for (y, x), name in STATIONS.items():
+        grid[y][x].name = name
+    return grid
@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict
+
+
+class NullProfiler:
+    """Stands in for a PhaseProfiler while profiling is off, so step runs the same code either way."""
+    __slots__ = ()
+
+    @staticmethod
+    def clock():
+        return 0.0
+
+    def record(self, phase: str, seconds: float, trains: int):
+        pass
+
+    def end_step(self, world_steps: int, queue_depth: int):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class PhaseProfiler:
+    """
+    Collects wall time, call counts and train counts of the phases of GridWorldEnv.step. It only stores running sums
+    and maxima, so the memory does not grow with the number of steps. With an action repeat one step runs some phases
+    once per world step, so calls of step and world steps are counted apart.
+    """
+
+    def __init__(self, phases):
+        """
+        :param phases: names of the phases in the order they are run within a step
+        """
+        self.phases = tuple(phases)
+        self.steps = 0
+        self.world_steps = 0
+        self.calls = None
+        self.seconds = None
+        self.max_seconds = None
+        self.trains = None
+        self.max_queue_depth = 0
+        self.last_step = None
+        self.reset()
+
+    def reset(self):
+        """
+        Drops all collected data.
+        :return: None
+        """
+        self.steps = 0
+        self.world_steps = 0
+        self.calls = dict.fromkeys(self.phases, 0)
+        self.seconds = dict.fromkeys(self.phases, 0.0)
+        self.max_seconds = dict.fromkeys(self.phases, 0.0)
+        self.trains = dict.fromkeys(self.phases, 0)
+        self.max_queue_depth = 0
+        self.last_step = OrderedDict()
+
+    clock = staticmethod(time.perf_counter)
+
+    def record(self, phase: str, seconds: float, trains: int):
+        """
+        Adds one call of a phase. Calls of the same phase within one step are summed up.
+        :param phase: name of the phase
+        :param seconds: wall time of the call
+        :param trains: number of active trains when the phase started
+        :return: None
+        """
+        self.calls[phase] += 1
+        self.seconds[phase] += seconds
+        self.trains[phase] += trains
+        if seconds > self.max_seconds[phase]:
+            self.max_seconds[phase] = seconds
+        last = self.last_step.get(phase)
+        if last is None:
+            self.last_step[phase] = {"seconds": seconds, "calls": 1, "trains": trains}
+        else:
+            last["seconds"] += seconds
+            last["calls"] += 1
+            last["trains"] += trains
+
+    def end_step(self, world_steps: int, queue_depth: int):
+        """
+        Closes a step after all of its phases were recorded.
+        :param world_steps: number of world steps taken by the step
+        :param queue_depth: longest chain of trains waiting for each other that was resolved in any of them
+        :return: dict with the summed time, the number of calls and the mean number of trains of every phase of the
+        step, as put into the info dict
+        """
+        self.steps += 1
+        self.world_steps += world_steps
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+        for phase in self.last_step.values():
+            phase["trains"] /= phase["calls"]
+        step = {"phases": self.last_step, "seconds": sum(phase["seconds"] for phase in self.last_step.values()),
+                "world_steps": world_steps, "queue_depth": queue_depth}
+        self.last_step = OrderedDict()
+        return step
+
+    def summary(self):
+        """
+        Aggregates everything recorded since the last reset.
+        :return: dict with the calls of step and the world steps taken by them, both per second, and the cumulative
+        and mean time, the share of the step time, the call count and the mean number of trains of every phase
+        """
+        total = sum(self.seconds.values())
+        phases = OrderedDict()
+        for phase in self.phases:
+            calls = self.calls[phase]
+            phases[phase] = {
+                "calls": calls,
+                "total_s": self.seconds[phase],
+                "mean_us": self.seconds[phase] / calls * 1e6 if calls else 0.0,
+                "max_us": self.max_seconds[phase] * 1e6,
+                "share": self.seconds[phase] / total if total else 0.0,
+                "mean_trains": self.trains[phase] / calls if calls else 0.0,
+            }
+        return {"steps": self.steps, "world_steps": self.world_steps, "total_s": total,
+                "steps_per_sec": self.steps / total if total else 0.0,
+                "world_steps_per_sec": self.world_steps / total if total else 0.0,
+                "max_queue_depth": self.max_queue_depth, "phases": phases}
@@ -0,0 +1,194 @@
+import numpy as np
+
+from gridworld_gym.envs.helper import Signal, Switch, Stop
+from gridworld_gym.envs.layout import DIRECTIONS, GRID_HEIGHT, GRID_WIDTH
+
+TILE_SIZE = 12
+BACKGROUND_COLOUR = (24, 24, 24)
+TRACK_COLOUR = (150, 150, 150)
+SWITCHED_COLOUR = (90, 90, 150)
+STOP_COLOUR = (230, 200, 60)
+SIGNAL_COLOURS = ((40, 200, 70), (220, 40, 40))
+LINE_COLOURS = {1: (200, 60, 60), 2: (250, 140, 30), 4: (60, 120, 220), 5: (40, 170, 200), 6: (150, 80, 200),
+                7: (240, 220, 50)}
+DEFAULT_LINE_COLOUR = (220, 220, 220)
+
+
+def _cell_text(cell):
+    """
+    Text of a tile of the grid as drawn by the original renderer, None for signals whose text depends on their status.
+    """
+    if cell == 0:
+        return "  "
+    if isinstance(cell, str):
+        return 2 * cell
+    if isinstance(cell, Switch):
+        return "W" + cell.status_switched
+    if isinstance(cell, Stop):
+        return "SP"
+    return None
+
+
+def _draw_track(tile, symbol: str, colour):
+    """
+    Draws a track symbol two pixels wide into a square tile.
+    """
+    size = len(tile)
+    centre = size // 2
+    pixels = np.arange(size)
+    if symbol == "-":
+        tile[centre - 1:centre + 1, :] = colour
+    elif symbol == "|":
+        tile[:, centre - 1:centre + 1] = colour
+    elif symbol == "/":
+        tile[size - 1 - pixels, pixels] = colour
+        tile[size - 1 - pixels[1:], pixels[:-1]] = colour
+    elif symbol == "\\":
+        tile[pixels, pixels] = colour
+        tile[pixels[1:], pixels[:-1]] = colour
+
+
+def _blank(size: int):
+    tile = np.empty((size, size, 3), dtype=np.uint8)
+    tile[:] = BACKGROUND_COLOUR
+    return tile
+
+
+class GridRenderer:
+    """
+    Renders a GridWorldEnv as text or as an RGB image. The static track layout is drawn once, every frame only patches
+    the tiles of signals and trains that changed since the previous frame.
+    """
+
+    def __init__(self, env, tile_size: int = TILE_SIZE):
+        """
+        Pre-renders the background of the grid of an env and builds the tile atlas of the image mode.
+        :param env: GridWorldEnv
+        :param tile_size: edge length of a tile in pixels
+        """
+        self.env = env
+        self.tile_size = tile_size
+        cells = [cell for row in env.grid for cell in row]
+        self.signals = tuple((index, cell) for index, cell in enumerate(cells) if isinstance(cell, Signal))
+
+        # Text mode: two characters per tile, joined per row, rows are only joined again if one of their tiles changed
+        self.background_text = [_cell_text(cell) or "S0" for cell in cells]
+        self.text = list(self.background_text)
+        self.rows = ["".join(self.text[y * GRID_WIDTH:(y + 1) * GRID_WIDTH]) + "\n" for y in range(GRID_HEIGHT)]
+        self.dirty_rows = set()
+        self.drawn_text = dict()
+
+        # Image mode: every tile is an index into the atlas
+        atlas = [_blank(tile_size)]
+        keys = {None: 0}
+        self.background_tiles = np.zeros(GRID_HEIGHT * GRID_WIDTH, dtype=np.intp)
+        for index, cell in enumerate(cells):
+            key = self._tile_key(cell)
+            if key not in keys:
+                keys[key] = len(atlas)
+                atlas.append(self._draw_background(cell))
+            self.background_tiles[index] = keys[key]
+        self.signal_tiles = tuple(len(atlas) + status for status in range(len(SIGNAL_COLOURS)))
+        atlas.extend(self._draw_signal(colour) for colour in SIGNAL_COLOURS)
+        self.train_tiles = dict()
+        for line_number, colour in list(LINE_COLOURS.items()) + [(None, DEFAULT_LINE_COLOUR)]:
+            for direction in DIRECTIONS:
+                self.train_tiles[(line_number, direction)] = len(atlas)
+                atlas.append(self._draw_train(colour, direction))
+        self.atlas = np.stack(atlas)
+        self.image = self.atlas[self.background_tiles].reshape(GRID_HEIGHT, GRID_WIDTH, tile_size, tile_size, 3) \
+            .transpose(0, 2, 1, 3, 4).reshape(GRID_HEIGHT * tile_size, GRID_WIDTH * tile_size, 3).copy()
+        self.drawn_tiles = dict()
+
+    @staticmethod
+    def _tile_key(cell):
+        if cell == 0:
+            return None
+        if isinstance(cell, Switch):
+            return "W", cell.default, cell.status_switched
+        if isinstance(cell, (Signal, Stop)):
+            return type(cell).__name__
+        return cell
+
+    def _draw_background(self, cell):
+        tile = _blank(self.tile_size)
+        if isinstance(cell, str):
+            _draw_track(tile, cell, TRACK_COLOUR)
+        elif isinstance(cell, Switch):
+            _draw_track(tile, cell.status_switched, SWITCHED_COLOUR)
+            _draw_track(tile, cell.default, TRACK_COLOUR)
+        elif isinstance(cell, Stop):
+            tile[2:-2, 2:-2] = STOP_COLOUR
+        return tile
+
+    def _draw_signal(self, colour):
+        tile = _blank(self.tile_size)
+        quarter = self.tile_size // 4
+        tile[quarter:-quarter, quarter:-quarter] = colour
+        return tile
+
+    def _draw_train(self, colour, direction: str):
+        tile = _blank(self.tile_size)
+        tile[1:-1, 1:-1] = colour
+        # bright edge at the front of the train
+        front = {"^": (slice(1, 3), slice(1, -1)), ">": (slice(1, -1), slice(-3, -1)),
+                 "v": (slice(-3, -1), slice(1, -1)), "<": (slice(1, -1), slice(1, 3))}[direction]
+        tile[front] = 255
+        return tile
+
+    def _overlay(self, text: bool):
+        """
+        Collects the dynamic tiles of the current state: signals and, on top of them, trains.
+        :return: dict flat cell index -> text or atlas index
+        """
+        trains = self.env.trains
+        if text:
+            overlay = {cell: "S" + str(signal.status) for cell, signal in self.signals}
+            for (x, y), train in trains.items():
+                overlay[y * GRID_WIDTH + x] = str(train.line_number) + train.direction
+        else:
+            signal_tiles, train_tiles = self.signal_tiles, self.train_tiles
+            overlay = {cell: signal_tiles[signal.status] for cell, signal in self.signals}
+            for (x, y), train in trains.items():
+                key = (train.line_number, train.direction)
+                overlay[y * GRID_WIDTH + x] = train_tiles[key if key in train_tiles else (None, train.direction)]
+        return overlay
+
+    def render_text(self):
+        """
+        Draws the grid with two characters per tile and one line per row.
+        :return: str
+        """
+        overlay = self._overlay(text=True)
+        text, drawn = self.text, self.drawn_text
+        for cell in drawn.keys() - overlay.keys():
+            text[cell] = self.background_text[cell]
+            self.dirty_rows.add(cell // GRID_WIDTH)
+        for cell, value in overlay.items():
+            if drawn.get(cell) != value:
+                text[cell] = value
+                self.dirty_rows.add(cell // GRID_WIDTH)
+        self.drawn_text = overlay
+        for y in self.dirty_rows:
+            self.rows[y] = "".join(text[y * GRID_WIDTH:(y + 1) * GRID_WIDTH]) + "\n"
+        self.dirty_rows.clear()
+        return "".join(self.rows)
+
+    def render_rgb(self):
+        """
+        Draws the grid as an image with one atlas tile per grid tile.
+        :return: uint8 array of shape (height * tile_size, width * tile_size, 3), a copy that is not changed by later
+        frames
+        """
+        overlay = self._overlay(text=False)
+        drawn = self.drawn_tiles
+        changed = {cell: self.background_tiles[cell] for cell in drawn.keys() - overlay.keys()}
+        changed.update((cell, tile) for cell, tile in overlay.items() if drawn.get(cell) != tile)
+        self.drawn_tiles = overlay
+        if changed:
+            size = self.tile_size
+            cells = np.fromiter(changed.keys(), dtype=np.intp, count=len(changed))
+            tiles = self.atlas[np.fromiter(changed.values(), dtype=np.intp, count=len(changed))]
+            view = self.image.reshape(GRID_HEIGHT, size, GRID_WIDTH, size, 3).transpose(0, 2, 1, 3, 4)
+            view[cells // GRID_WIDTH, cells % GRID_WIDTH] = tiles
+        return self.image.copy()
@@ -0,0 +1,227 @@
+import bisect
+import math
+from collections import OrderedDict
+
+# Bin edges of the delay histograms: single world steps up to 20, then coarser bins for long delays
+DELAY_BIN_EDGES = tuple(range(-5, 21)) + tuple(range(25, 101, 5)) + tuple(range(125, 501, 25))
+QUANTILES = (50, 90, 99)
+
+
+class RunningStats:
+    """Count, mean, variance, minimum and maximum of a stream of values (Welford's algorithm)."""
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        difference = value - self.mean
+        self.mean += difference / self.count
+        self.m2 += difference * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """
+        Adds the values of another RunningStats (Chan's parallel update).
+        :param other: RunningStats
+        :return: None
+        """
+        if not other.count:
+            return
+        count = self.count + other.count
+        difference = other.mean - self.mean
+        self.m2 += other.m2 + difference * difference * self.count * other.count / count
+        self.mean += difference * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+
+class Histogram:
+    """
+    Counts of values in fixed bins. counts[0] holds the values below the first edge, counts[i] the values in
+    [edges[i - 1], edges[i]) and counts[-1] the values from the last edge on.
+    """
+    __slots__ = ("edges", "counts")
+
+    def __init__(self, edges=DELAY_BIN_EDGES):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+
+    def add(self, value):
+        self.counts[bisect.bisect_right(self.edges, value)] += 1
+
+    def merge(self, other):
+        """
+        :param other: Histogram with the same edges
+        :return: None
+        """
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+
+    def quantile(self, q: float):
+        """
+        Interpolates linearly within the bin the quantile falls into. Values outside of the edges are clamped to the
+        first and last edge.
+        :param q: quantile between 0 and 1
+        :return: float or None without values
+        """
+        total = sum(self.counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == 0:
+                    return float(self.edges[0])
+                if index == len(self.edges):
+                    return float(self.edges[-1])
+                low, high = self.edges[index - 1], self.edges[index]
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return float(self.edges[-1])
+
+
+class DelayStats:
+    """Running moments and a histogram of the delays of one kind of event."""
+    __slots__ = ("moments", "histogram")
+
+    def __init__(self):
+        self.moments = RunningStats()
+        self.histogram = Histogram()
+
+    def add(self, delay):
+        self.moments.add(delay)
+        self.histogram.add(delay)
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.histogram.merge(other.histogram)
+
+    def summary(self):
+        """
+        :return: dict with count, mean, std, min, max and the QUANTILES from the histogram
+        """
+        moments = self.moments
+        if not moments.count:
+            return {"count": 0}
+        result = {"count": moments.count, "mean": moments.mean, "std": math.sqrt(moments.variance),
+                  "min": moments.min, "max": moments.max}
+        result.update({f"p{quantile}": self.histogram.quantile(quantile / 100) for quantile in QUANTILES})
+        return result
+
+
+def _merged(stats):
+    merged = DelayStats()
+    for delay_stats in stats:
+        merged.merge(delay_stats)
+    return merged
+
+
+class PunctualityStats:
+    """
+    Punctuality of the trains per line and per station. Arrivals at a station, the delay gained while dwelling there
+    and the delays of the trains leaving the grid are aggregated as they happen in constant memory, so the figures
+    can be collected over any number of episodes.
+    """
+
+    def __init__(self, on_time: int = 3):
+        """
+        :param on_time: an arrival counts as punctual if the train is delayed by at most this many world steps
+        """
+        self.on_time = on_time
+        self.arrivals = dict()  # (line, station) -> DelayStats of the arrival delays
+        self.dwell = dict()  # (line, station) -> DelayStats of the delays gained at the station
+        self.punctual = dict()  # (line, station) -> number of punctual arrivals
+        self.exits = dict()  # line -> DelayStats of the delays of the trains leaving the grid
+
+    def clear(self):
+        """
+        Drops all collected data.
+        :return: None
+        """
+        self.arrivals.clear()
+        self.dwell.clear()
+        self.punctual.clear()
+        self.exits.clear()
+
+    def arrival(self, line: int, station: str, delay: int):
+        key = (line, station)
+        stats = self.arrivals.get(key)
+        if stats is None:
+            stats = self.arrivals[key] = DelayStats()
+            self.punctual[key] = 0
+        stats.add(delay)
+        if delay <= self.on_time:
+            self.punctual[key] += 1
+
+    def departure(self, line: int, station: str, dwell_delay: int):
+        key = (line, station)
+        stats = self.dwell.get(key)
+        if stats is None:
+            stats = self.dwell[key] = DelayStats()
+        stats.add(dwell_delay)
+
+    def exit(self, line: int, delay: int):
+        stats = self.exits.get(line)
+        if stats is None:
+            stats = self.exits[line] = DelayStats()
+        stats.add(delay)
+
+    def merge(self, other):
+        """
+        Adds the data of another PunctualityStats, e.g. of another env or process.
+        :param other: PunctualityStats
+        :return: None
+        """
+        for mine, theirs in ((self.arrivals, other.arrivals), (self.dwell, other.dwell), (self.exits, other.exits)):
+            for key, stats in theirs.items():
+                if key not in mine:
+                    mine[key] = DelayStats()
+                mine[key].merge(stats)
+        for key, count in other.punctual.items():
+            self.punctual[key] = self.punctual.get(key, 0) + count
+
+    def _group(self, keys):
+        arrivals = [self.arrivals[key] for key in keys if key in self.arrivals]
+        arrival_count = sum(stats.moments.count for stats in arrivals)
+        punctual = sum(self.punctual.get(key, 0) for key in keys)
+        return {"arrivals": arrival_count, "punctuality": punctual / arrival_count if arrival_count else None,
+                "arrival_delay": _merged(arrivals).summary(),
+                "dwell_delay": _merged(self.dwell[key] for key in keys if key in self.dwell).summary()}
+
+    def summary(self):
+        """
+        :return: dict with the figures of every line (in total and per station it serves), of every station over all
+        lines and of the whole network. Every group has the number of arrivals, the share of punctual arrivals and
+        summaries of the arrival and dwell delays, lines and the network also of the delays at the exit.
+        """
+        keys = set(self.arrivals) | set(self.dwell)
+        lines = sorted({line for line, _ in keys} | set(self.exits))
+        stations = sorted({station for _, station in keys})
+        result = {"on_time": self.on_time, "lines": OrderedDict(), "stations": OrderedDict()}
+        for line in lines:
+            line_keys = [key for key in keys if key[0] == line]
+            figures = self._group(line_keys)
+            figures["exit_delay"] = self.exits[line].summary() if line in self.exits else {"count": 0}
+            figures["stations"] = OrderedDict((station, self._group([(line, station)]))
+                                              for station in stations if (line, station) in keys)
+            result["lines"][line] = figures
+        for station in stations:
+            result["stations"][station] = self._group([key for key in keys if key[1] == station])
+        result["network"] = self._group(list(keys))
+        result["network"]["exit_delay"] = _merged(self.exits.values()).summary()
+        return result
@@ -0,0 +1,243 @@
+import multiprocessing
+import traceback
+from typing import Optional
+
+import numpy as np
+from gym.vector import VectorEnv
+
+from gridworld_gym.envs.grid_world import GridWorldEnv, ACTION_SIZES
+from gridworld_gym.envs.layout import OBSERVATION_INDEX, OBSERVATION_SLICES
+
+
+def _shared_arrays(num_envs: int, context):
+    """
+    Allocates the shared memory through which actions and step results are exchanged with the workers.
+    :return: dict name -> (ctypes type code, shape, numpy dtype) and dict name -> raw shared array
+    """
+    layout = {
+        "actions": ("q", (num_envs, len(ACTION_SIZES)), np.int64),
+        "observations": ("f", (num_envs, len(OBSERVATION_INDEX)), np.float32),
+        "terminal_observations": ("f", (num_envs, len(OBSERVATION_INDEX)), np.float32),
+        "rewards": ("d", (num_envs,), np.float64),
+        "dones": ("b", (num_envs,), np.int8),
+        "average_delay": ("d", (num_envs,), np.float64),
+    }
+    raw = {name: context.RawArray(code, int(np.prod(shape))) for name, (code, shape, _) in layout.items()}
+    return layout, raw
+
+
+def _as_numpy(layout, raw):
+    return {name: np.frombuffer(raw[name], dtype=dtype).reshape(shape) for name, (_, shape, dtype) in layout.items()}
+
+
+def _worker(pipe, parent_pipe, config, indices, layout, raw, auto_reset):
+    """
+    Hosts the envs of one worker process. Commands arrive through the pipe, results are written into shared memory
+    and only a short acknowledgement is sent back.
+    """
+    parent_pipe.close()
+    buffers = _as_numpy(layout, raw)
+    actions, observations, terminal = buffers["actions"], buffers["observations"], buffers["terminal_observations"]
+    rewards, dones, average_delay = buffers["rewards"], buffers["dones"], buffers["average_delay"]
+    envs = [GridWorldEnv(config) for _ in indices]
+    try:
+        while True:
+            command, data = pipe.recv()
+            if command == "step":
+                for env, index in zip(envs, indices):
+                    _, reward, done, info = env.step(actions[index])
+                    rewards[index] = reward
+                    dones[index] = done
+                    average_delay[index] = info["average_delay"]
+                    if done and auto_reset:
+                        terminal[index] = env._observation
+                        env.reset()
+                    observations[index] = env._observation
+                pipe.send(("ok", None))
+            elif command == "reset":
+                for env, index in zip(envs, indices):
+                    if data is None or index in data:
+                        env.reset(seed=None if data is None else data[index])
+                        observations[index] = env._observation
+                pipe.send(("ok", None))
+            elif command == "close":
+                pipe.send(("ok", None))
+                break
+            else:
+                raise ValueError(f"Unknown command {command}.")
+    except (KeyboardInterrupt, EOFError):
+        pass
+    except Exception:
+        pipe.send(("error", traceback.format_exc()))
+    finally:
+        pipe.close()
+
+
+class SubprocVectorGridWorldEnv(VectorEnv):
+    """
+    Runs GridWorldEnv instances in worker processes. Every worker hosts a contiguous block of the envs and steps them
+    one after the other. Actions, observations, rewards, dones and average delays are exchanged through shared memory,
+    the pipes only carry the commands, so nothing is pickled per step.
+    """
+
+    def __init__(self, num_envs: int = 8, num_workers: Optional[int] = None, config=None, seed: Optional[int] = None,
+                 auto_reset: bool = True, context: Optional[str] = None):
+        """
+        Starts the worker processes.
+        :param num_envs: number of envs
+        :param num_workers: number of worker processes, at most one per env, defaults to the number of cores
+        :param config: env config of every GridWorldEnv (see GridWorldEnv.__init__)
+        :param seed: env i is seeded with seed + i on the first reset
+        :param auto_reset: reset envs that are done within step_wait and keep their last observation in
+        info["terminal_observation"]. Without auto reset the envs have to be reset with reset_at.
+        :param context: multiprocessing start method, e.g. "spawn" or "fork"
+        """
+        config = dict(config or dict())
+        single_env = GridWorldEnv(config)
+        super(SubprocVectorGridWorldEnv, self).__init__(num_envs, single_env.observation_space,
+                                                        single_env.action_space)
+        self.flat_spaces = single_env.flat_spaces
+        self.auto_reset = auto_reset
+        self._seed = seed
+        self.closed = False
+
+        context = multiprocessing.get_context(context)
+        layout, raw = _shared_arrays(num_envs, context)
+        self._buffers = _as_numpy(layout, raw)
+        num_workers = min(num_envs, num_workers or multiprocessing.cpu_count())
+        self.worker_indices = [block.tolist() for block in np.array_split(np.arange(num_envs), num_workers)]
+        self.pipes = list()
+        self.processes = list()
+        for indices in self.worker_indices:
+            parent_pipe, child_pipe = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(child_pipe, parent_pipe, config, indices, layout, raw, auto_reset))
+            process.start()
+            child_pipe.close()
+            self.pipes.append(parent_pipe)
+            self.processes.append(process)
+
+    def _send(self, command: str, data=None, workers=None):
+        workers = range(len(self.pipes)) if workers is None else workers
+        for worker in workers:
+            self.pipes[worker].send((command, data))
+        for worker in workers:
+            status, message = self.pipes[worker].recv()
+            if status == "error":
+                raise RuntimeError(f"Worker {worker} failed:\n{message}")
+
+    def _observation(self, observations):
+        if self.flat_spaces:
+            return observations
+        return {key: observations[:, part] for key, part in OBSERVATION_SLICES.items()}
+
+    def reset(
+            self,
+            *,
+            seed: Optional[int] = None,
+            return_info: bool = False,
+            options: Optional[dict] = None,
+    ):
+        """
+        Resets all envs. Env i is seeded with seed + i, the seed of the constructor is used on the first reset.
+        :return: observation of all envs
+        """
+        seed = self._seed if seed is None else seed
+        self._seed = None
+        self._send("reset", None if seed is None else {index: seed + index for index in range(self.num_envs)})
+        return self._observation(self._buffers["observations"].copy())
+
+    def reset_at(self, index: int, seed: Optional[int] = None):
+        """
+        Resets a single env.
+        :param index: index of the env
+        :param seed: optional seed of the env
+        :return: observation of the env as the single env returns it
+        """
+        worker = next(worker for worker, indices in enumerate(self.worker_indices) if index in indices)
+        self._send("reset", {index: seed}, workers=[worker])
+        observation = self._buffers["observations"][index].copy()
+        if self.flat_spaces:
+            return observation
+        return {key: observation[part] for key, part in OBSERVATION_SLICES.items()}
+
+    def step_async(self, actions):
+        self._buffers["actions"][:] = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, len(ACTION_SIZES))
+        for pipe in self.pipes:
+            pipe.send(("step", None))
+
+    def step_wait(self, **kwargs):
+        for worker, pipe in enumerate(self.pipes):
+            status, message = pipe.recv()
+            if status == "error":
+                raise RuntimeError(f"Worker {worker} failed:\n{message}")
+        buffers = self._buffers
+        done = buffers["dones"].astype(bool)
+        info = {"average_delay": buffers["average_delay"].copy()}
+        if self.auto_reset and done.any():
+            info["terminal_observation"] = self._observation(buffers["terminal_observations"].copy())
+        return self._observation(buffers["observations"].copy()), buffers["rewards"].copy(), done, info
+
+    def step(self, actions):
+        """
+        Steps all envs in parallel.
+        :param actions: integer array of shape (num_envs, 7), one action tuple per env
+        :return: observation of all envs, rewards, dones and the average delays
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def close_extras(self, **kwargs):
+        if self.closed:
+            return
+        self.closed = True
+        for pipe in self.pipes:
+            try:
+                pipe.send(("close", None))
+                pipe.recv()
+            except (BrokenPipeError, EOFError):
+                pass
+            pipe.close()
+        for process in self.processes:
+            process.join(timeout=5)
+
+
+def rllib_vector_env(env_config=None):
+    """
+    Env creator for RLlib, e.g. tune.register_env("gridworld-subproc", rllib_vector_env). RLlib resets finished
+    envs itself, so the workers do not reset automatically.
+    :param env_config: env config of every GridWorldEnv plus "num_envs", "num_workers" and "seed"
+    :return: ray.rllib.env.vector_env.VectorEnv
+    """
+    from ray.rllib.env.vector_env import VectorEnv as RLlibVectorEnv
+
+    config = dict(env_config or dict())
+    num_envs = config.pop("num_envs", 8)
+    num_workers = config.pop("num_workers", None)
+    seed = config.pop("seed", None)
+
+    class RLlibSubprocVectorEnv(RLlibVectorEnv):
+        def __init__(self):
+            self.env = SubprocVectorGridWorldEnv(num_envs, num_workers, config, seed, auto_reset=False)
+            super(RLlibSubprocVectorEnv, self).__init__(self.env.single_observation_space,
+                                                        self.env.single_action_space, num_envs)
+
+        def _split(self, observation):
+            return [observation[index] for index in range(self.num_envs)] if self.env.flat_spaces else \
+                [{key: value[index] for key, value in observation.items()} for index in range(self.num_envs)]
+
+        def vector_reset(self):
+            return self._split(self.env.reset())
+
+        def reset_at(self, index=None):
+            return self.env.reset_at(0 if index is None else index)
+
+        def vector_step(self, actions):
+            observation, rewards, dones, info = self.env.step(actions)
+            infos = [{"average_delay": delay} for delay in info["average_delay"].tolist()]
+            return self._split(observation), rewards.tolist(), dones.tolist(), infos
+
+        def get_sub_environments(self):
+            return list()
+
+    return RLlibSubprocVectorEnv()
@@ -0,0 +1,74 @@
+import heapq
+from typing import NamedTuple
+
+
+class Departure(NamedTuple):
+    """A line that enters the grid every headway world steps, starting at world step offset."""
+    line: int
+    reverse: bool
+    offset: int
+    headway: int
+
+
+# Default timetable of the Mannheim grid: every line departs once every 20 world steps
+TIMETABLE = (
+    Departure(6, False, 1, 20),
+    Departure(4, False, 2, 20),
+    Departure(4, True, 2, 20),
+    Departure(1, True, 3, 20),
+    Departure(1, False, 4, 20),
+    Departure(7, True, 8, 20),
+    Departure(6, True, 9, 20),
+    Departure(5, False, 9, 20),
+)
+
+
+class Timetable:
+    """Scheduler that keeps the next departure of every line in a priority queue."""
+
+    def __init__(self, departures=TIMETABLE):
+        """
+        :param departures: iterable of Departure or (line, reverse, offset, headway) tuples. Departures due at the
+        same world step are returned in the given order.
+        """
+        self.departures = tuple(Departure(*departure) for departure in departures)
+        for departure in self.departures:
+            if departure.headway < 1 or departure.offset < 0:
+                raise ValueError(f"Departure needs a positive headway and a non-negative offset, got {departure}")
+        self._queue = list()
+        self.reset()
+
+    def reset(self):
+        """
+        Schedules the first departure of every line at its offset.
+        :return: None
+        """
+        self._queue = [(departure.offset, index) for index, departure in enumerate(self.departures)]
+        heapq.heapify(self._queue)
+
+    def get_state(self):
+        """
+        :return: tuple of the scheduled (world step, departure index) pairs
+        """
+        return tuple(self._queue)
+
+    def set_state(self, state):
+        """
+        Restores the schedule from get_state.
+        :param state: tuple of (world step, departure index) pairs
+        :return: None
+        """
+        self._queue = list(state)
+
+    def due(self, world_step: int):
+        """
+        Pops all departures that are due at the given world step and schedules their next departure.
+        :param world_step: current world step
+        :return: generator of Departure
+        """
+        queue = self._queue
+        while queue and queue[0][0] <= world_step:
+            step, index = queue[0]
+            departure = self.departures[index]
+            heapq.heapreplace(queue, (step + departure.headway, index))
+            yield departure
@@ -1,170 +1,171 @@
 # from base import Grid
 
-import random
+from gridworld_gym.envs.layout import SIGNAL, STOP
 
-from gridworld_gym.envs.helper import Switch, Signal, Stop
 
+class TrainTable:
+    """
+    Struct-of-arrays storage of all trains of an env. Every train occupies a slot, i.e. the same index in every
+    column, and the slots of trains that left the grid are reused by the next spawn. Each slot has one preallocated
+    Train handle, so spawning a train allocates nothing once the table is large enough.
+    """
 
-class Train:
-    def __init__(self, start_x: int, start_y: int, direction: str, line: int, grid, switches,
-                 delay: int = 0):
+    def __init__(self, grid, capacity: int = 64):
         """
-        :param start_x:
-        :param start_y:
-        :param direction:
-        :param grid:
-        :param delay:
-        :return:
+        :param grid: env the trains move in
+        :param capacity: number of slots allocated up front, the table doubles if it runs full
         """
-        self.x = start_x
-        self.y = start_y
-        self.direction = direction
         self.grid = grid
-        self.delay = delay
-        self.world_step = self.grid.add_train_to_grid(self.x, self.y, self)
-        self.switches = switches
-        self.line_number = line
+        self.capacity = 0
+        self.x = list()
+        self.y = list()
+        self.direction = list()
+        self.delay = list()
+        self.line = list()
+        self.route = list()
+        self.route_index = list()
+        # delay of the train when it arrived at the stop it is on
+        self.arrival_delay = list()
+        self.alive = list()
+        self.handles = list()
+        self.free = list()
+        self.grow(capacity)
+
+    def grow(self, capacity: int):
+        """
+        Appends slots until the table holds capacity trains.
+        :param capacity: new number of slots
+        :return: None
+        """
+        added = capacity - self.capacity
+        for column, default in ((self.x, 0), (self.y, 0), (self.direction, ""), (self.delay, 0), (self.line, 0),
+                                (self.route, None), (self.route_index, 0), (self.arrival_delay, 0),
+                                (self.alive, False)):
+            column.extend([default] * added)
+        self.handles.extend(Train(self, slot) for slot in range(self.capacity, capacity))
+        # lowest free slot last, so that it is used first
+        self.free = list(range(capacity - 1, self.capacity - 1, -1)) + self.free
+        self.capacity = capacity
+
+    def spawn(self, route: tuple, line: int, delay: int):
+        """
+        Puts a train at the start of its route into a free slot. The train is not placed on the grid.
+        :param route: precompiled route of the line, see layout.compile_route
+        :param line: line number
+        :param delay: initial delay
+        :return: Train handle of the slot
+        """
+        if not self.free:
+            self.grow(2 * self.capacity)
+        slot = self.free.pop()
+        self.x[slot], self.y[slot], self.direction[slot], _ = route[0]
+        self.delay[slot] = delay
+        self.line[slot] = line
+        self.route[slot] = route
+        self.route_index[slot] = 0
+        self.arrival_delay[slot] = delay
+        self.alive[slot] = True
+        return self.handles[slot]
+
+    def release(self, train):
+        """
+        Frees the slot of a train that left the world.
+        :param train: Train handle
+        :return: None
+        """
+        slot = train.slot
+        self.alive[slot] = False
+        self.route[slot] = None
+        self.free.append(slot)
+
+    def clear(self):
+        """
+        Frees all slots.
+        :return: None
+        """
+        for slot in range(self.capacity):
+            self.alive[slot] = False
+            self.route[slot] = None
+        self.free = list(range(self.capacity - 1, -1, -1))
+
+    def __len__(self):
+        return self.capacity - len(self.free)
+
+
+class Train:
+    """Handle of a train in the TrainTable of an env. All state lives in the table, the handle only knows its slot."""
+    __slots__ = ("table", "slot")
+
+    def __init__(self, table: TrainTable, slot: int):
+        """
+        :param table: TrainTable the train is stored in
+        :param slot: index of the train in every column of the table
+        """
+        self.table = table
+        self.slot = slot
+
+    @property
+    def x(self):
+        return self.table.x[self.slot]
+
+    @property
+    def y(self):
+        return self.table.y[self.slot]
+
+    @property
+    def direction(self):
+        return self.table.direction[self.slot]
+
+    @property
+    def delay(self):
+        return self.table.delay[self.slot]
+
+    @property
+    def line_number(self):
+        return self.table.line[self.slot]
+
+    @property
+    def route(self):
+        return self.table.route[self.slot]
+
+    @property
+    def route_index(self):
+        return self.table.route_index[self.slot]
 
     def read_track(self):
+        """
+        Looks up the next tile of the route. The only dynamic parts are red signals, which hold the train, and stops,
+        which add a random dwell time drawn by the env.
+        :return: new x & y value, new direction, reward and the train itself
+        """
+        table, slot = self.table, self.slot
+        route, index = table.route[slot], table.route_index[slot]
+        x, y, direction, tile_code = route[index]
 
-        grid_symbol = self.grid.grid[self.y][self.x]
-
-        if type(grid_symbol) == Switch:
-            # print(f"Line {self.line_number} || On Switch ({self.y}|{self.x}) || Have these symbols remaining: {self.switches} || Switch accepts: {grid_symbol.default,grid_symbol.status_switched}")
-            try:
-                grid_symbol.change_status(self.switches.popleft())
-            except IndexError:
-                print(f"Popped from an empty dequeue. {self.line_number} at switch {self.y}|{self.x}")
-            grid_symbol = grid_symbol.status
-        elif type(grid_symbol) == Signal:
-            grid_symbol = grid_symbol.status
-        elif type(grid_symbol) == Stop:
-            grid_symbol = "10"
-
-        # left / right horizontal
-        if grid_symbol == "-":
-            if self.direction == "<":
-                new_x = self.x - 1
-                new_y = self.y
-            elif self.direction == ">":
-                new_x = self.x + 1
-                new_y = self.y
-            elif self.direction == "^":
-                new_x = self.x
-                new_y = self.y - 1
-            elif self.direction == "v":
-                new_x = self.x
-                new_y = self.y + 1
-            direction = self.direction
-
-        # up / down vertical
-        elif grid_symbol == "|":
-            if self.direction == "^":
-                new_x = self.x
-                new_y = self.y - 1
-            elif self.direction == "v":
-                new_x = self.x
-                new_y = self.y + 1
-            elif self.direction == ">":
-                new_x = self.x + 1
-                new_y = self.y
-            elif self.direction == "<":
-                new_x = self.x - 1
-                new_y = self.y
-            direction = self.direction
-
-        # station / reward tile
-        elif grid_symbol == "10":
-            if self.direction == "^":
-                new_x = self.x
-                new_y = self.y - 1
-            elif self.direction == "v":
-                new_x = self.x
-                new_y = self.y + 1
-            elif self.direction == "<":
-                new_x = self.x - 1
-                new_y = self.y
-            elif self.direction == ">":
-                new_x = self.x + 1
-                new_y = self.y
-            self.delay += random.randint(0, 2)
-            direction = self.direction
-
-        # curve left
-        elif grid_symbol == "/":
-            if self.direction == "<":
-                new_x = self.x - 1
-                new_y = self.y + 1
-                direction = "v"
-            elif self.direction == ">":
-                new_x = self.x + 1
-                new_y = self.y - 1
-                direction = "^"
-            elif self.direction == "^":
-                new_x = self.x + 1
-                new_y = self.y - 1
-                direction = ">"
-            elif self.direction == "v":
-                new_x = self.x - 1
-                new_y = self.y + 1
-                direction = "<"
-
-        # curve right
-        elif grid_symbol == "\\":
-            if self.direction == "<":
-                new_x = self.x - 1
-                new_y = self.y - 1
-                direction = "^"
-            elif self.direction == ">":
-                new_x = self.x + 1
-                new_y = self.y + 1
-                direction = "v"
-            elif self.direction == "^":
-                new_x = self.x - 1
-                new_y = self.y - 1
-                direction = "<"
-            elif self.direction == "v":
-                new_x = self.x + 1
-                new_y = self.y + 1
-                direction = ">"
-
-        elif grid_symbol == 1:  # Signal == rot
-            new_x = self.x
-            new_y = self.y
-            self.delay += 1
-            direction = self.direction
-        elif grid_symbol == 0:  # Signal == grün
-            if self.direction == "^":
-                new_x = self.x
-                new_y = self.y - 1
-            elif self.direction == "v":
-                new_x = self.x
-                new_y = self.y + 1
-            elif self.direction == "<":
-                new_x = self.x - 1
-                new_y = self.y
-            elif self.direction == ">":
-                new_x = self.x + 1
-                new_y = self.y
-            direction = self.direction
-
-        if grid_symbol == "10":
+        if tile_code == SIGNAL and table.grid.grid[y][x].status == 1:  # Signal == rot
+            table.grid.add_delay(self, 1)
+            return x, y, direction, 0, self
+
+        new_x, new_y, new_direction, _ = route[index + 1]
+
+        if tile_code == STOP:
+            table.grid.add_delay(self, next(table.grid.dwell_times))
             # reward = min(round(100 - (abs(1 / 3 * self.delay ** 3) + abs(5 / 8 * self.delay)), 1), 100)
-            reward = min(100-self.delay**2, 100)
+            reward = min(100 - table.delay[slot] ** 2, 100)
         else:
             reward = 0
 
-        return new_x, new_y, direction, reward, self
+        return new_x, new_y, new_direction, reward, self
 
     def move(self, new_x, new_y, new_direction):
         # print("Moving:", self)
-        self.grid.train_grid[self.y][self.x] = 0
-        self.grid.train_grid[new_y][new_x] = self
+        table, slot = self.table, self.slot
+        table.grid.remove_train_from_grid(table.x[slot], table.y[slot], release=False)
 
-        self.x = new_x
-        self.y = new_y
-        self.direction = new_direction
+        table.route_index[slot] += 1
+        table.x[slot] = new_x
+        table.y[slot] = new_y
+        table.direction[slot] = new_direction
+        table.grid.add_train_to_grid(new_x, new_y, self)
 
         # print(f"Train {self.line_number} \n From {new_x} | {new_y} to {self.x} | {self.y}")
-
-        self.world_step += 1
@@ -0,0 +1,230 @@
+from typing import Optional
+
+import numpy as np
+from gym.vector import VectorEnv
+
+from gridworld_gym.envs.grid_world import GridWorldEnv, COMPILED_GRID, CLUSTER_SIGNALS, CLUSTERED_SIGNALS, \
+    ACTION_SIZES, ROUTES
+from gridworld_gym.envs.layout import OBSERVATION_INDEX, OBSERVATION_SLICES, SIGNAL, STOP
+from gridworld_gym.envs.timetable import Departure, TIMETABLE
+
+
+class VectorGridWorldEnv(VectorEnv):
+    """
+    Batched counterpart of GridWorldEnv. It keeps num_envs independent worlds as stacked numpy arrays and advances all
+    of them with one call to step. Every cell of every world is addressed by a flat index env * cells + y * width + x.
+    The direction of a train follows from its route and its index along the route.
+    """
+
+    def __init__(self, num_envs: int = 8, seed: Optional[int] = None, max_world_step: int = 800,
+                 timetable=TIMETABLE):
+        """
+        Builds the lookup tables from the compiled Mannheim grid and allocates the per cell train arrays for all worlds.
+        :param num_envs: number of independent worlds
+        :param seed: seed of the random generator used for start delays and dwell times
+        :param max_world_step: world step after which an episode is done
+        :param timetable: iterable of Departure or (line, reverse, offset, headway) tuples
+        """
+        single_env = GridWorldEnv()
+        super(VectorGridWorldEnv, self).__init__(num_envs, single_env.observation_space, single_env.action_space)
+        self.max_world_step = max_world_step
+        self.np_random = np.random.default_rng(seed)
+        self._actions = None
+
+        # Static layout
+        compiled = COMPILED_GRID
+        self.height, self.width = compiled.tiles.shape
+        self.cells = self.height * self.width
+        self.tiles = compiled.tiles.ravel()
+        self.signal_index = compiled.signal_index.ravel()
+
+        # Routes of every (line, reverse) pair as flat cell indices, -1 marks the exit
+        self.route_keys = list(ROUTES)
+        route_id = {key: index for index, key in enumerate(self.route_keys)}
+        longest = max(len(route) for route in ROUTES.values())
+        self.route_cells = np.full((len(self.route_keys), longest), -1, dtype=np.int64)
+        self.route_lines = np.array([line_number for line_number, _ in self.route_keys], dtype=np.int8)
+        for index, route in enumerate(ROUTES.values()):
+            self.route_cells[index, :len(route) - 1] = [y * self.width + x for x, y, _, _ in route[:-1]]
+
+        # Timetable as arrays, so that the due departures of all worlds are found with one comparison
+        departures = [Departure(*departure) for departure in timetable]
+        self.departure_routes = np.array([route_id[(line, reverse)] for line, reverse, _, _ in departures],
+                                         dtype=np.int64)
+        self.departure_offsets = np.array([departure.offset for departure in departures], dtype=np.int64)
+        self.departure_headways = np.array([departure.headway for departure in departures], dtype=np.int64)
+
+        # Signal index of every (cluster, action) pair, -1 for action 0 which turns the whole cluster red
+        self.cluster_signals = np.full((len(CLUSTER_SIGNALS), max(ACTION_SIZES)), -1, dtype=np.int16)
+        for cluster, signals in enumerate(CLUSTER_SIGNALS):
+            self.cluster_signals[cluster, 1:len(signals)] = signals[1:]
+        self.clustered_signals = np.array(CLUSTERED_SIGNALS)
+
+        # Mutable state of all worlds
+        size = self.num_envs * self.cells
+        self.occupied = np.zeros(size, dtype=bool)
+        self.delay = np.zeros(size, dtype=np.int32)
+        self.route = np.zeros(size, dtype=np.int8)
+        self.route_index = np.zeros(size, dtype=np.int16)
+        self.world_step = np.zeros(self.num_envs, dtype=np.int64)
+        self.signals = np.zeros((self.num_envs, len(compiled.signal_positions)), dtype=np.int8)
+        self._slot = np.full(size, -1, dtype=np.int64)
+
+    def reset(
+            self,
+            *,
+            seed: Optional[int] = None,
+            return_info: bool = False,
+            options: Optional[dict] = None,
+    ):
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        self._reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self._convert_to_observation_space()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.int64).reshape(self.num_envs, len(ACTION_SIZES))
+
+    def step_wait(self, **kwargs):
+        self._add_lines()
+        self._update_signal(self._actions)
+        reward = self._update_world()
+        obs_state = self._convert_to_observation_space()
+        done = self.world_step > self.max_world_step
+        info = self._return_average_delay()
+        if done.any():
+            info["terminal_observation"] = {key: value.copy() for key, value in obs_state.items()}
+            self._reset_envs(done)
+            obs_state = self._convert_to_observation_space()
+        return obs_state, reward, done, info
+
+    def step(self, actions):
+        """
+        Advances all worlds by one step. Worlds that are done are reset automatically, their last observation is kept
+        in info["terminal_observation"].
+        :param actions: integer array of shape (num_envs, 7), one action tuple per world
+        :return: observation dict of (num_envs, n) arrays, rewards, dones and the average delays
+        """
+        self.step_async(actions)
+        return self.step_wait()
+
+    def _reset_envs(self, mask):
+        """
+        Removes all trains of the selected worlds and restores their signals and world step.
+        :param mask: boolean array of shape (num_envs,)
+        :return: None
+        """
+        self.occupied.reshape(self.num_envs, self.cells)[mask] = False
+        self.world_step[mask] = 0
+        self.signals[mask] = 0
+
+    def _add_lines(self):
+        """
+        Places the trains of all departures that are due at the current world step. Like GridWorldEnv a new train replaces
+        a train that still occupies the start tile.
+        :return: None
+        """
+        since_offset = self.world_step[:, None] - self.departure_offsets
+        envs, departures = np.nonzero((since_offset >= 0) & (since_offset % self.departure_headways == 0))
+        routes = self.departure_routes[departures]
+        index = envs * self.cells + self.route_cells[routes, 0]
+        self.occupied[index] = True
+        self.delay[index] = self.np_random.integers(-3, 4, size=len(index))
+        self.route[index] = routes
+        self.route_index[index] = 0
+
+    def _update_signal(self, actions):
+        """
+        Turns every clustered signal red and the signal selected by the action of its cluster green.
+        :param actions: integer array of shape (num_envs, 7)
+        :return: None
+        """
+        self.signals[:, self.clustered_signals] = 1
+        selected = self.cluster_signals[np.arange(len(ACTION_SIZES)), actions]
+        envs, _ = np.nonzero(selected >= 0)
+        self.signals[envs, selected[selected >= 0]] = 0
+
+    def _update_world(self):
+        """
+        Moves every train of every world by at most one tile along its route. Red signals hold the train, stops add
+        a random dwell time. Trains queued behind each other move together as long as the head of the queue moves; if
+        two trains want the same tile the one first in row-major order wins.
+        :return: reward per world
+        """
+        self.world_step += 1
+        trains = np.flatnonzero(self.occupied)
+        envs = trains // self.cells
+        cells = trains % self.cells
+        codes = self.tiles[cells]
+        routes = self.route[trains]
+        positions = self.route_index[trains]
+        delays = self.delay[trains]
+
+        # Red signals hold the train and delay it
+        signal_trains = np.flatnonzero(codes == SIGNAL)
+        red = self.signals[envs[signal_trains], self.signal_index[cells[signal_trains]]] == 1
+        held = np.zeros(len(trains), dtype=bool)
+        held[signal_trains[red]] = True
+        delays = delays + held
+
+        # Stops add a random dwell time and reward the train according to its delay
+        on_stop = codes == STOP
+        delays[on_stop] += self.np_random.integers(0, 3, size=int(on_stop.sum()), dtype=np.int32)
+        train_reward = np.where(on_stop, np.minimum(100 - delays.astype(np.int64) ** 2, 100), 0).astype(np.float64)
+        self.delay[trains] = delays
+
+        next_cells = self.route_cells[routes, positions + 1]
+        exits = next_cells < 0
+        movers = np.flatnonzero(~exits & ~held)
+        targets = envs[movers] * self.cells + next_cells[movers]
+
+        # Only the first train in row-major order may claim a tile
+        _, first = np.unique(targets, return_index=True)
+        eligible = np.zeros(len(movers), dtype=bool)
+        eligible[first] = True
+
+        # Resolve queues: a train moves onto a free tile or onto a tile whose train moved away this step
+        self._slot[trains] = np.arange(len(trains))
+        occupant = self._slot[targets]
+        self._slot[trains] = -1
+        moved = exits.copy()
+        waiting = eligible
+        while True:
+            moving = waiting & ((occupant < 0) | moved[np.maximum(occupant, 0)])
+            if not moving.any():
+                break
+            moved[movers[moving]] = True
+            waiting &= ~moving
+
+        moved_movers = moved[movers]
+        train_reward[movers[~moved_movers]] = -1
+        reward = np.bincount(envs, weights=train_reward, minlength=self.num_envs)
+
+        sources = trains[movers[moved_movers]]
+        destinations = targets[moved_movers]
+        new_positions = positions[movers[moved_movers]] + 1
+        attributes = [(array, array[sources]) for array in (self.delay, self.route)]
+        self.occupied[trains[exits]] = False
+        self.occupied[sources] = False
+        self.occupied[destinations] = True
+        self.route_index[destinations] = new_positions
+        for array, values in attributes:
+            array[destinations] = values
+
+        return np.maximum(reward, -100)
+
+    def _convert_to_observation_space(self):
+        """
+        Reads the delay of the trains on the probe tiles in front of every signal cluster, -2 if there is no train.
+        :return: dict of (num_envs, n) float32 arrays, all views into one contiguous buffer
+        """
+        index = (np.arange(self.num_envs) * self.cells)[:, None] + OBSERVATION_INDEX
+        flat = np.where(self.occupied[index], self.delay[index], -2).astype(np.float32)
+        return {key: flat[:, part] for key, part in OBSERVATION_SLICES.items()}
+
+    def _return_average_delay(self):
+        occupied = self.occupied.reshape(self.num_envs, self.cells)
+        amount_trains = occupied.sum(axis=1)
+        delay = np.where(occupied, self.delay.reshape(self.num_envs, self.cells), 0).sum(axis=1)
+        return {"average_delay": np.divide(delay, amount_trains, out=np.zeros(self.num_envs),
+                                           where=amount_trains > 0)}
@@ -0,0 +1,218 @@
+"""
+Evaluates policies over many seeded episodes of GridWorldEnv in a process pool and prints the results as JSON.
+
+    python -m gridworld_gym.evaluation --policies random fixed_cycle greedy --episodes 64 --output eval.json
+
+A policy is any picklable callable that maps the observation of the env to an action tuple. If it has a reset(seed)
+method, it is called at the start of every episode, a bind(env) method gets the env of the episode (e.g. for the
+planner of gridworld_gym.planning). The worker processes run copies of the policy, a merge(copy) method adds what
+they collected back into the policy and the result of a stats() method is added to the report as "policy".
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+from gridworld_gym.envs.layout import OBSERVATION_SLICES
+from gridworld_gym.envs.statistics import PunctualityStats
+
+PERCENTILES = (50, 90, 99)
+
+
+class RandomPolicy:
+    """Picks a uniformly random action for every cluster."""
+
+    def __init__(self, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, observation):
+        return [int(self.rng.integers(size)) for size in ACTION_SIZES]
+
+
+class FixedCyclePolicy:
+    """Classic fixed-time signal plan: every cluster turns its signals green one after the other for period steps."""
+
+    def __init__(self, period: int = 10):
+        """
+        :param period: number of steps a signal stays green
+        """
+        self.period = period
+        self.step = 0
+
+    def reset(self, seed: int):
+        self.step = 0
+
+    def __call__(self, observation):
+        phase = self.step // self.period
+        self.step += 1
+        return [1 + phase % (size - 1) for size in ACTION_SIZES]
+
+
+class GreedyPolicy:
+    """
+    Most delayed train first: every cluster turns the signal green whose probe tile holds the most delayed train. Not
+    every waiting train is visible, e.g. the probe of a signal can lie behind it, so a cluster without trains on its
+    probe tiles steps to its next signal every period steps, and no signal stays green for more than max_hold steps
+    while trains wait elsewhere or the cluster sees nothing.
+    """
+
+    def __init__(self, period: int = 5, max_hold: int = 10):
+        """
+        :param period: number of steps a signal stays green if no train is on a probe tile of the cluster
+        :param max_hold: number of steps after which a signal gives way to the other signals of its cluster
+        """
+        self.period = period
+        self.max_hold = max_hold
+        self.action = [1] * len(ACTION_SIZES)
+        self.held = [0] * len(ACTION_SIZES)
+
+    def reset(self, seed: int):
+        self.action = [1] * len(ACTION_SIZES)
+        self.held = [0] * len(ACTION_SIZES)
+
+    def __call__(self, observation):
+        if not isinstance(observation, dict):
+            observation = {key: observation[part] for key, part in OBSERVATION_SLICES.items()}
+        for cluster, key in enumerate(OBSERVATION_SLICES):
+            delays = np.asarray(observation[key])
+            waiting = delays != -2
+            current, held = self.action[cluster], self.held[cluster]
+            if held >= self.max_hold:
+                waiting[current - 1] = False
+            if waiting.any():
+                choice = int(np.argmax(np.where(waiting, delays, -np.inf))) + 1
+            elif held >= self.period:
+                choice = 1 + current % (ACTION_SIZES[cluster] - 1)
+            else:
+                choice = current
+            self.held[cluster] = held + 1 if choice == current else 1
+            self.action[cluster] = choice
+        return list(self.action)
+
+
+BASELINES = {"random": RandomPolicy, "fixed_cycle": FixedCyclePolicy, "greedy": GreedyPolicy}
+
+
+def run_episode(policy, seed: int, config=None):
+    """
+    Runs one episode.
+    :param policy: callable observation -> action
+    :param seed: seed of the env and the policy
+    :param config: env config
+    :return: dict with the total reward, the mean and final average delay, the number of world steps, the delays
+    of the trains that left the grid, the gridlock reported in the last step (None without gridlock) and the
+    PunctualityStats of the episode if the config enables them
+    """
+    env = GridWorldEnv(config)
+    if hasattr(policy, "bind"):
+        policy.bind(env)
+    if hasattr(policy, "reset"):
+        policy.reset(seed)
+    observation = env.reset(seed=seed)
+    total_reward, delays, done = 0.0, list(), False
+    while not done:
+        observation, reward, done, info = env.step(policy(observation))
+        total_reward += reward
+        delays.append(info["average_delay"])
+    return {"seed": seed, "reward": total_reward, "average_delay": float(np.mean(delays)),
+            "final_average_delay": float(delays[-1]), "world_steps": env.world_step,
+            "exit_delays": list(env.exit_delays), "gridlock": info.get("gridlock"), "statistics": env.statistics}
+
+
+def _run_episodes(policy, seeds, config):
+    return [run_episode(policy, seed, config) for seed in seeds], policy
+
+
+def _distribution(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {"count": 0}
+    result = {"count": int(len(values)), "mean": float(values.mean()), "std": float(values.std())}
+    result.update({f"p{percentile}": float(np.percentile(values, percentile)) for percentile in PERCENTILES})
+    return result
+
+
+def evaluate(policy, episodes: int = 32, seed: int = 0, config=None, workers=None):
+    """
+    Runs a policy over episodes seeded seed, seed + 1, ... in a process pool and aggregates the results.
+    :param policy: picklable callable observation -> action
+    :param episodes: number of episodes
+    :param seed: seed of the first episode
+    :param config: env config
+    :param workers: number of processes, 1 evaluates in this process, None uses all cores
+    :return: dict of aggregated metrics, with the punctuality per line and station if the config enables statistics
+    and the stats of the policy if it has any
+    """
+    if episodes < 1:
+        raise ValueError(f"episodes has to be at least 1, got {episodes}.")
+    seeds = list(range(seed, seed + episodes))
+    workers = min(episodes, workers or os.cpu_count() or 1)
+    start = time.perf_counter()
+    if workers == 1:
+        results, _ = _run_episodes(policy, seeds, config)
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(_run_episodes, policy, chunk.tolist(), config)
+                       for chunk in np.array_split(seeds, workers)]
+            chunks = [future.result() for future in futures]
+        results = [result for chunk, _ in chunks for result in chunk]
+        if hasattr(policy, "merge"):
+            for _, copy in chunks:
+                policy.merge(copy)
+    seconds = time.perf_counter() - start
+
+    world_steps = sum(result["world_steps"] for result in results)
+    exits = [delay for result in results for delay in result["exit_delays"]]
+    report = {
+        "episodes": episodes,
+        "reward": _distribution([result["reward"] for result in results]),
+        "average_delay": _distribution([result["average_delay"] for result in results]),
+        "final_average_delay": _distribution([result["final_average_delay"] for result in results]),
+        "throughput_per_step": len(exits) / world_steps if world_steps else 0.0,
+        "exit_delay": _distribution(exits),
+        "gridlock_rate": sum(result["gridlock"] is not None for result in results) / len(results),
+        "seconds": seconds,
+        "steps_per_sec": world_steps / seconds if seconds else 0.0,
+    }
+    if results[0]["statistics"] is not None:
+        statistics = PunctualityStats(results[0]["statistics"].on_time)
+        for result in results:
+            statistics.merge(result["statistics"])
+        report["punctuality"] = statistics.summary()
+    if hasattr(policy, "stats"):
+        report["policy"] = policy.stats()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the baseline policies on the Mannheim grid world.")
+    parser.add_argument("--policies", nargs="+", choices=sorted(BASELINES), default=sorted(BASELINES))
+    parser.add_argument("--episodes", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, default: all cores")
+    parser.add_argument("--statistics", action="store_true", help="report the punctuality per line and station")
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    config = {"statistics": True} if args.statistics else None
+    report = {name: evaluate(BASELINES[name](), args.episodes, args.seed, config, workers=args.workers)
+              for name in args.policies}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Lookahead signal controller that plans by random shooting: candidate action sequences are simulated forward from the
+current state of the env and the first action of the best sequence is applied. Prints the reward of the planned
+episodes and the decisions/sec as JSON.
+
+    python -m gridworld_gym.planning --budget 0.05 --horizon 10 --workers 4 --steps 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+
+_worker_env = None
+
+
+def _simulation_config(config):
+    # rollouts must not add to the statistics or the profile of the controlled env
+    return dict(config or dict(), statistics=False, profile=False)
+
+
+def _init_worker(config):
+    global _worker_env
+    _worker_env = GridWorldEnv(_simulation_config(config))
+
+
+def _evaluate(state, sequences, seeds, gamma: float, env=None):
+    """
+    Simulates action sequences from a state. Every rollout draws its own future dwell times and start delays, so the
+    planner cannot exploit the random numbers the real env will draw.
+    :param state: EnvState to start from
+    :param sequences: int array of shape (candidates, horizon, 7)
+    :param seeds: seed of every rollout
+    :param gamma: discount factor
+    :param env: env to simulate in, the env of the worker process if None
+    :return: list of discounted returns, number of simulated steps
+    """
+    env = _worker_env if env is None else env
+    returns, steps = list(), 0
+    for sequence, seed in zip(sequences, seeds):
+        env.set_state(state)
+        env.seed(int(seed))
+        total, discount = 0.0, 1.0
+        for action in sequence:
+            _, reward, done, _ = env.step(action)
+            total += discount * reward
+            discount *= gamma
+            steps += 1
+            if done:
+                break
+        returns.append(total)
+    return returns, steps
+
+
+class RandomShootingPlanner:
+    """
+    Picks the action of all seven signal clusters by simulating random action sequences for a fixed time budget. A
+    sequence keeps its previous action with keep_probability, so that most candidates are stable signal plans. The
+    rest of the best plan is tried again at the next decision. Usable like any policy of gridworld_gym.evaluation: a
+    pickled planner leaves its env, rollout env and process pool behind and creates them again on its next decision.
+    """
+
+    def __init__(self, config=None, horizon: int = 10, budget: float = 0.05, batch: int = 16,
+                 min_candidates: int = 16, gamma: float = 0.95, keep_probability: float = 0.8, workers: int = 0,
+                 seed: int = 0):
+        """
+        :param config: env config of the simulated envs, has to match the env that is controlled
+        :param horizon: number of steps of every candidate sequence
+        :param budget: planning time per decision in seconds
+        :param batch: number of candidates per task
+        :param min_candidates: number of candidates evaluated even if the budget is exceeded
+        :param gamma: discount factor of the rollout rewards
+        :param keep_probability: probability that a cluster keeps its action in the next step of a sequence
+        :param workers: number of rollout processes, 0 simulates in this process
+        :param seed: seed of the candidate sequences and rollouts
+        """
+        self.config = config
+        self.horizon = horizon
+        self.budget = budget
+        self.batch = batch
+        self.min_candidates = min_candidates
+        self.gamma = gamma
+        self.keep_probability = keep_probability
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+        self.sizes = np.array(ACTION_SIZES)
+        self.env = None
+        self.plan = None
+        self._scratch = None
+        self._pool = None
+        self.decisions = 0
+        self.candidates = 0
+        self.simulated_steps = 0
+        self.seconds = 0.0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(env=None, _scratch=None, _pool=None)
+        return state
+
+    def _start(self):
+        """
+        Creates the rollout env or the process pool on the first decision, also after unpickling or close.
+        :return: None
+        """
+        if not self.workers and self._scratch is None:
+            self._scratch = GridWorldEnv(_simulation_config(self.config))
+        elif self.workers and self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.config,))
+
+    def bind(self, env: GridWorldEnv):
+        """
+        Sets the env that __call__ plans for.
+        :param env: GridWorldEnv
+        :return: None
+        """
+        self.env = env
+
+    def reset(self, seed: int):
+        self.rng = np.random.default_rng(seed)
+        self.plan = None
+
+    def __call__(self, observation):
+        return self.act(self.env)
+
+    def _sample(self, count: int):
+        """
+        :return: int array of shape (count, horizon, 7)
+        """
+        shape = (count, self.horizon, len(ACTION_SIZES))
+        fresh = (self.rng.random(shape) * self.sizes).astype(np.int64)
+        keep = self.rng.random(shape) < self.keep_probability
+        keep[:, 0] = False
+        sequences = fresh
+        for step in range(1, self.horizon):
+            sequences[:, step] = np.where(keep[:, step], sequences[:, step - 1], fresh[:, step])
+        if self.plan is not None:
+            # the rest of the previous best plan, held at its last action
+            sequences[0, :len(self.plan)] = self.plan
+            sequences[0, len(self.plan):] = self.plan[-1]
+        return sequences
+
+    def act(self, env: GridWorldEnv):
+        """
+        Plans the next action for the current state of env. The env itself is not changed.
+        :param env: GridWorldEnv
+        :return: list of 7 ints
+        """
+        self._start()
+        start = time.perf_counter()
+        deadline = start + self.budget
+        state = env.get_state()
+        best_return, best_sequence, evaluated = -np.inf, None, 0
+        while evaluated < self.min_candidates or time.perf_counter() < deadline:
+            tasks = max(1, self.workers)
+            sequences = self._sample(tasks * self.batch)
+            seeds = self.rng.integers(2 ** 31, size=len(sequences))
+            if not self.workers:
+                results = [_evaluate(state, sequences, seeds, self.gamma, self._scratch)]
+            else:
+                futures = [self._pool.submit(_evaluate, state, sequences[task::tasks], seeds[task::tasks], self.gamma)
+                           for task in range(tasks)]
+                results = [future.result() for future in futures]
+                sequences = np.concatenate([sequences[task::tasks] for task in range(tasks)])
+            returns = np.concatenate([result[0] for result in results])
+            self.simulated_steps += sum(result[1] for result in results)
+            evaluated += len(returns)
+            best = int(np.argmax(returns))
+            if returns[best] > best_return:
+                best_return, best_sequence = returns[best], sequences[best]
+            # the previous plan is only a candidate of the first batch
+            self.plan = None
+        self.plan = best_sequence[1:] if self.horizon > 1 else None
+        self.decisions += 1
+        self.candidates += evaluated
+        self.seconds += time.perf_counter() - start
+        return best_sequence[0].tolist()
+
+    def stats(self):
+        """
+        :return: dict with decisions/sec, candidates per decision and simulated steps/sec
+        """
+        return {"decisions": self.decisions,
+                "decisions_per_sec": self.decisions / self.seconds if self.seconds else 0.0,
+                "candidates_per_decision": self.candidates / self.decisions if self.decisions else 0.0,
+                "simulated_steps_per_sec": self.simulated_steps / self.seconds if self.seconds else 0.0}
+
+    def merge(self, other):
+        """
+        Adds the counters of a copy of this planner, e.g. one that ran in a process of gridworld_gym.evaluation.
+        :param other: RandomShootingPlanner
+        :return: None
+        """
+        self.decisions += other.decisions
+        self.candidates += other.candidates
+        self.simulated_steps += other.simulated_steps
+        self.seconds += other.seconds
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Control the Mannheim grid world with a random shooting planner.")
+    parser.add_argument("--budget", type=float, default=0.05, help="planning time per decision in seconds")
+    parser.add_argument("--horizon", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=0, help="rollout processes, -1 uses all cores")
+    parser.add_argument("--steps", type=int, default=200, help="controlled steps per episode")
+    parser.add_argument("--episodes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    workers = os.cpu_count() if args.workers < 0 else args.workers
+    planner = RandomShootingPlanner(horizon=args.horizon, budget=args.budget, batch=args.batch, workers=workers,
+                                    seed=args.seed)
+    env = GridWorldEnv()
+    rewards, final_delay = list(), None
+    for episode in range(args.episodes):
+        planner.reset(args.seed + episode)
+        env.reset(seed=args.seed + episode)
+        total, done = 0.0, False
+        for _ in range(args.steps):
+            _, reward, done, info = env.step(planner.act(env))
+            final_delay = info["average_delay"]
+            total += reward
+            if done:
+                break
+        rewards.append(total)
+    planner.close()
+
+    report = {"budget": args.budget, "horizon": args.horizon, "workers": workers, "steps": args.steps,
+              "rewards": rewards, "final_average_delay": final_delay}
+    report.update(planner.stats())
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Records episodes of GridWorldEnv into compact .npz files and replays them by re-simulating from the seed.
+
+    recorder = EpisodeRecorder(GridWorldEnv(), record_observations=True)
+    recorder.reset(seed=7)
+    done = False
+    while not done:
+        obs, reward, done, info = recorder.step(action)
+    recorder.save("episode.npz")
+
+    episode = Episode.load("episode.npz")
+    env = episode.replay(120)  # the env right after step 120
+"""
+import random
+from typing import Optional
+
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+from gridworld_gym.envs.layout import OBSERVATION_INDEX, OBSERVATION_SLICES
+from gridworld_gym.envs.timetable import Departure
+
+FORMAT_VERSION = 1
+
+
+class EpisodeRecorder:
+    """
+    Wraps an env and writes every step into preallocated typed arrays. The arrays grow by doubling if an episode is
+    longer than expected.
+    """
+
+    def __init__(self, env: GridWorldEnv, capacity: int = 1024, record_observations: bool = False):
+        """
+        :param env: GridWorldEnv that is stepped through the recorder
+        :param capacity: expected number of steps of an episode
+        :param record_observations: also store the observation of every step
+        """
+        self.env = env
+        self.record_observations = record_observations
+        self.seed = None
+        self.steps = 0
+        self.actions = np.zeros((capacity, len(ACTION_SIZES)), dtype=np.int8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.average_delay = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.observations = np.zeros((capacity + 1, len(OBSERVATION_INDEX)), dtype=np.float32) \
+            if record_observations else None
+
+    def reset(self, seed: Optional[int] = None):
+        """
+        Starts a new recording and resets the env with the seed.
+        :param seed: seed of the episode, drawn at random if None
+        :return: observation of the env
+        """
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.steps = 0
+        obs = self.env.reset(seed=self.seed)
+        if self.record_observations:
+            self._store_observation(0, obs)
+        return obs
+
+    def step(self, action):
+        """
+        Steps the env and records the action and its outcome.
+        :param action: action tuple of the env
+        :return: the result of env.step
+        """
+        obs, reward, done, info = self.env.step(action)
+        if self.steps == len(self.rewards):
+            self._grow()
+        step = self.steps
+        self.actions[step] = action
+        self.rewards[step] = reward
+        self.average_delay[step] = info["average_delay"]
+        self.dones[step] = done
+        if self.record_observations:
+            self._store_observation(step + 1, obs)
+        self.steps += 1
+        return obs, reward, done, info
+
+    def _store_observation(self, row: int, obs):
+        if isinstance(obs, dict):
+            for key, part in OBSERVATION_SLICES.items():
+                self.observations[row, part] = obs[key]
+        else:
+            self.observations[row] = obs
+
+    def _grow(self):
+        for name in ("actions", "rewards", "average_delay", "dones", "observations"):
+            array = getattr(self, name)
+            if array is not None:
+                grown = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+                grown[:len(array)] = array
+                setattr(self, name, grown)
+
+    def episode(self):
+        """
+        :return: Episode with copies of the recorded steps
+        """
+        steps = self.steps
+        return Episode(seed=self.seed, actions=self.actions[:steps].copy(), rewards=self.rewards[:steps].copy(),
+                       average_delay=self.average_delay[:steps].copy(), dones=self.dones[:steps].copy(),
+                       observations=None if self.observations is None else self.observations[:steps + 1].copy(),
+                       timetable=tuple(self.env.timetable.departures), action_repeat=self.env.action_repeat,
+                       skip_to_decision=self.env.skip_to_decision, gridlock=self.env.gridlock_config())
+
+    def save(self, path: str):
+        """
+        Writes the recorded episode into a compressed .npz file.
+        :param path: file name
+        :return: None
+        """
+        self.episode().save(path)
+
+
+def _gridlock_config(values):
+    cycle_patience, gridlock_patience, penalty = values.tolist()
+    return {"gridlock_termination": True, "cycle_patience": int(cycle_patience),
+            "gridlock_patience": int(gridlock_patience), "gridlock_penalty": None if np.isnan(penalty) else penalty}
+
+
+class Episode:
+    """A recorded episode. Every step can be reconstructed by re-simulating the actions from the seed."""
+
+    def __init__(self, seed: int, actions, rewards, average_delay, dones, observations=None, timetable=None,
+                 action_repeat: int = 1, skip_to_decision: bool = False, gridlock=None):
+        """
+        :param seed: seed the env was reset with
+        :param actions: int8 array of shape (steps, 7)
+        :param rewards: float32 array of shape (steps,)
+        :param average_delay: float32 array of shape (steps,)
+        :param dones: bool array of shape (steps,)
+        :param observations: optional float32 array of shape (steps + 1, 22), row 0 is the observation after reset
+        :param timetable: departures the env ran with
+        :param action_repeat: action repeat of the env
+        :param skip_to_decision: whether the env ended action repeats at decision points
+        :param gridlock: gridlock termination config of the env (see GridWorldEnv.gridlock_config), None if the env
+        did not end episodes on gridlocks
+        """
+        self.seed = seed
+        self.actions = actions
+        self.rewards = rewards
+        self.average_delay = average_delay
+        self.dones = dones
+        self.observations = observations
+        self.action_repeat = action_repeat
+        self.skip_to_decision = skip_to_decision
+        self.gridlock = gridlock
+        self.timetable = None if timetable is None else tuple(
+            Departure(int(line), bool(reverse), int(offset), int(headway))
+            for line, reverse, offset, headway in timetable)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def save(self, path: str):
+        """
+        Writes the episode into a compressed .npz file.
+        :param path: file name
+        :return: None
+        """
+        arrays = dict(version=FORMAT_VERSION, seed=self.seed, actions=self.actions, rewards=self.rewards,
+                      average_delay=self.average_delay, dones=self.dones, action_repeat=self.action_repeat,
+                      skip_to_decision=self.skip_to_decision)
+        if self.observations is not None:
+            arrays["observations"] = self.observations
+        if self.timetable is not None:
+            arrays["timetable"] = np.array(self.timetable, dtype=np.int64).reshape(-1, 4)
+        if self.gridlock is not None:
+            penalty = self.gridlock["gridlock_penalty"]
+            arrays["gridlock"] = np.array([self.gridlock["cycle_patience"], self.gridlock["gridlock_patience"],
+                                           np.nan if penalty is None else penalty], dtype=np.float64)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Reads an episode written by save.
+        :param path: file name
+        :return: Episode
+        """
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported episode format {int(data['version'])}, expected {FORMAT_VERSION}.")
+            return cls(seed=int(data["seed"]), actions=data["actions"], rewards=data["rewards"],
+                       average_delay=data["average_delay"], dones=data["dones"],
+                       observations=data["observations"] if "observations" in data else None,
+                       timetable=data["timetable"].tolist() if "timetable" in data else None,
+                       action_repeat=int(data["action_repeat"]), skip_to_decision=bool(data["skip_to_decision"]),
+                       gridlock=_gridlock_config(data["gridlock"]) if "gridlock" in data else None)
+
+    def make_env(self):
+        """
+        :return: a new env with the timetable, action repeat and gridlock termination of the episode
+        """
+        config = {"action_repeat": self.action_repeat, "skip_to_decision": self.skip_to_decision}
+        if self.timetable is not None:
+            config["timetable"] = self.timetable
+        if self.gridlock is not None:
+            config.update(self.gridlock)
+        return GridWorldEnv(config)
+
+    def replay(self, step: Optional[int] = None, env: Optional[GridWorldEnv] = None, check: bool = True):
+        """
+        Re-simulates the episode from its seed up to a step.
+        :param step: number of steps to re-simulate, the whole episode if None
+        :param env: env to replay in, a new one with the timetable of the episode if None
+        :param check: raise a RuntimeError if a reward differs from the recording
+        :return: the env right after the step
+        """
+        step = len(self) if step is None else step
+        if not 0 <= step <= len(self):
+            raise IndexError(f"Step {step} is outside of the recorded episode of length {len(self)}.")
+        env = env if env is not None else self.make_env()
+        env.reset(seed=self.seed)
+        for index in range(step):
+            _, reward, _, _ = env.step(self.actions[index])
+            if check and np.float32(reward) != self.rewards[index]:
+                raise RuntimeError(f"Replay diverged at step {index}: reward {reward}, recorded {self.rewards[index]}.")
+        return env
@@ -0,0 +1,266 @@
+"""
+Incremental loader for Ray Tune experiment directories such as logs/PPO. Every poll only reads the bytes that were
+appended to the progress.csv files since the previous poll and only keeps the selected columns.
+
+    experiment = ExperimentLog("logs/PPO", columns=["training_iteration", "episode_reward_mean"])
+    while training:
+        experiment.poll()
+        print(experiment.last("episode_reward_mean"))
+"""
+import csv
+import io
+import json
+import os
+
+import numpy as np
+
+BOOLEANS = {"True": 1.0, "False": 0.0}
+
+
+def _to_float(value: str):
+    if value in BOOLEANS:
+        return BOOLEANS[value]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class Column:
+    """Growable column. Numeric columns are float64 arrays (NaN for empty cells), all others lists of strings."""
+
+    def __init__(self, capacity: int = 256):
+        self.numeric = None
+        self.size = 0
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.strings = None
+
+    def extend(self, values):
+        """
+        Appends the raw string values of new rows.
+        :param values: list of str
+        :return: None
+        """
+        if self.numeric is None:
+            sample = next((value for value in values if value != ""), None)
+            if sample is not None:
+                self.numeric = _to_float(sample) is not None
+                if not self.numeric:
+                    self.strings = [""] * self.size
+        if self.numeric is False:
+            self.strings.extend(values)
+            self.size += len(values)
+            return
+        parsed = [_to_float(value) if value != "" else np.nan for value in values]
+        if any(value is None for value in parsed):
+            # a numeric column turned out to hold text, keep it as strings from now on
+            self.strings = [str(float(value)) if not np.isnan(value) else "" for value in self.values[:self.size]]
+            self.numeric = False
+            self.strings.extend(values)
+            self.size += len(values)
+            return
+        if self.size + len(parsed) > len(self.values):
+            grown = np.empty(max(2 * len(self.values), self.size + len(parsed)), dtype=np.float64)
+            grown[:self.size] = self.values[:self.size]
+            self.values = grown
+        self.values[self.size:self.size + len(parsed)] = parsed
+        self.size += len(parsed)
+
+    def data(self):
+        """
+        :return: float64 view of the rows or a list of strings
+        """
+        if self.numeric is False:
+            return self.strings
+        return self.values[:self.size]
+
+
+class TrialLog:
+    """Tails the progress.csv of one trial and reads its params.json on demand."""
+
+    def __init__(self, path: str, columns=None):
+        """
+        :param path: directory of the trial
+        :param columns: names of the columns to keep, None keeps all columns
+        """
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path))
+        self.progress_path = os.path.join(path, "progress.csv")
+        self.selected = None if columns is None else list(columns)
+        self.header = None
+        self.rows = 0
+        self.columns = dict()
+        self._offset = 0
+        self._params = None
+        self._params_mtime = None
+
+    @property
+    def params(self):
+        """
+        Config of the trial from params.json, read again only if the file changed.
+        :return: dict
+        """
+        params_path = os.path.join(self.path, "params.json")
+        try:
+            mtime = os.stat(params_path).st_mtime
+        except FileNotFoundError:
+            return dict()
+        if mtime != self._params_mtime:
+            with open(params_path) as file:
+                self._params = json.load(file)
+            self._params_mtime = mtime
+        return self._params
+
+    def select(self, columns):
+        """
+        Starts keeping further columns. Rows that were already read are read again for these columns only.
+        :param columns: column names
+        :return: None
+        """
+        if self.selected is None:
+            return
+        new = [column for column in columns if column not in self.selected]
+        if not new:
+            return
+        self.selected.extend(new)
+        if self.header is not None and self.rows:
+            with open(self.progress_path, "rb") as file:
+                text = file.read(self._offset).decode("utf-8")
+            self._parse(text.split("\n", 1)[1], [column for column in new if column in self.header])
+
+    def poll(self):
+        """
+        Reads the rows appended since the last poll. A file that got shorter was rewritten and is read from the start.
+        :return: number of new rows
+        """
+        try:
+            size = os.stat(self.progress_path).st_size
+        except FileNotFoundError:
+            return 0
+        if size < self._offset:
+            self.header, self.rows, self.columns, self._offset = None, 0, dict(), 0
+        if size == self._offset:
+            return 0
+        with open(self.progress_path, "rb") as file:
+            file.seek(self._offset)
+            chunk = file.read(size - self._offset)
+        # only complete lines are parsed, a partly written row is read with the next poll
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return 0
+        self._offset += end
+        text = chunk[:end].decode("utf-8")
+        if self.header is None:
+            header, text = text.split("\n", 1)
+            self.header = next(csv.reader([header]))
+        wanted = self.header if self.selected is None else \
+            [column for column in self.selected if column in self.header]
+        rows = self._parse(text, wanted)
+        self.rows += rows
+        return rows
+
+    def _parse(self, text: str, columns):
+        """
+        Appends the values of complete csv lines to the given columns.
+        :return: number of parsed rows
+        """
+        lines = list(csv.reader(io.StringIO(text)))
+        for column in columns:
+            position = self.header.index(column)
+            if column not in self.columns:
+                self.columns[column] = Column()
+            self.columns[column].extend([line[position] if position < len(line) else "" for line in lines])
+        return len(lines)
+
+    def column(self, name: str):
+        """
+        :param name: column name, selected lazily if it was not kept so far
+        :return: float64 array or list of str with one value per row
+        """
+        if name not in self.columns:
+            self.select([name])
+        column = self.columns.get(name)
+        return column.data() if column is not None else np.full(self.rows, np.nan)
+
+    def summary(self, columns):
+        """
+        :param columns: numeric column names
+        :return: dict column -> last, min, max and mean over all rows
+        """
+        result = dict()
+        for name in columns:
+            values = self.column(name)
+            if isinstance(values, list) or not len(values) or np.isnan(values).all():
+                result[name] = {"last": values[-1] if len(values) else None}
+                continue
+            result[name] = {"last": float(values[-1]), "min": float(np.nanmin(values)),
+                            "max": float(np.nanmax(values)), "mean": float(np.nanmean(values))}
+        return result
+
+
+class ExperimentLog:
+    """All trials below an experiment directory. New trials are picked up by the next poll."""
+
+    def __init__(self, root: str, columns=None):
+        """
+        :param root: experiment directory, e.g. logs/PPO
+        :param columns: names of the columns to keep of every trial, None keeps all columns
+        """
+        self.root = root
+        self.selected = None if columns is None else list(columns)
+        self.trials = dict()
+
+    def poll(self):
+        """
+        Discovers new trials and reads the new rows of all trials.
+        :return: dict trial name -> number of new rows
+        """
+        for directory, _, files in os.walk(self.root):
+            if "progress.csv" in files and directory not in self.trials:
+                self.trials[directory] = TrialLog(directory, self.selected)
+        return {trial.name: trial.poll() for trial in self.trials.values()}
+
+    def select(self, columns):
+        """
+        Starts keeping further columns in every trial.
+        :param columns: column names
+        :return: None
+        """
+        if self.selected is not None:
+            self.selected.extend(column for column in columns if column not in self.selected)
+        for trial in self.trials.values():
+            trial.select(columns)
+
+    def last(self, column: str):
+        """
+        :param column: numeric column name
+        :return: dict trial name -> value of the latest row
+        """
+        result = dict()
+        for trial in self.trials.values():
+            values = trial.column(column)
+            result[trial.name] = float(values[-1]) if len(values) and not isinstance(values, list) else None
+        return result
+
+    def summaries(self, columns):
+        """
+        :param columns: numeric column names
+        :return: dict trial name -> TrialLog.summary
+        """
+        return {trial.name: trial.summary(columns) for trial in self.trials.values()}
+
+    def best(self, column: str = "episode_reward_mean", mode: str = "max"):
+        """
+        :param column: numeric column name
+        :param mode: "max" or "min"
+        :return: name of the trial with the best value of the column over all its rows, None without data
+        """
+        best, best_value = None, None
+        for trial in self.trials.values():
+            values = trial.column(column)
+            if isinstance(values, list) or not len(values) or np.isnan(values).all():
+                continue
+            value = np.nanmax(values) if mode == "max" else np.nanmin(values)
+            if best_value is None or (value > best_value if mode == "max" else value < best_value):
+                best, best_value = trial.name, value
+        return best
@@ -1,9 +1,11 @@
 # install tensorflow beforehand manually
 # install CUDA manually - for GPU support conda install -c conda-forge cudatoolkit=11.2 cudnn=8.1.0 (https://www.tensorflow.org/install/pip#windows_1)
+import argparse
+import os
+
 import gym
 import ray
 from ray import tune
-import os
 import gridworld_gym
 from gridworld_gym.envs import GridWorldEnv as env_creator
 
@@ -12,34 +14,115 @@ log_dir = "logs/"
 log_path = os.path.join(os.getcwd(), log_dir)
 # env = gym.make("gridworld-v0")
 RAY_IGNORE_UNHANDLED_ERRORS = 1
-ray.init(local_mode=True, ignore_reinit_error=True)  # local_mode=True when no GPU is available
 seed = 123
 max_iter = 1000
+# Rough resident memory of one RLlib rollout worker with its policy, the envs themselves only need a few 100 KiB
+MEMORY_PER_WORKER = 1.5 * 2 ** 30
+ROLLOUT_FRAGMENT_LENGTH = 200
 # print(env.render(mode='human', close=False))
 ##########################################################################################
 
-# run without GPU
-print("--Start RL--")
-tune.register_env("gridworld-v0", env_creator)
-
-tune.run("PPO",
-         config={
-             "env": "gridworld-v0",
-             "num_gpus": 0,  # 1 => with gpu
-             "seed": seed,
-             # "evaluation_interval": 2,
-             # "evaluation_duration": 10,
-             "horizon": 400,
-             "soft_horizon": False,
-             # "ignore_worker_failures": True,
-
-         },
-         local_dir=log_dir,
-         # name="OnTime-RL",
-         verbose=3,
-         stop=ray.tune.stopper.MaximumIterationStopper(max_iter)  # ,
-         # time_budget_s=100
-        ,reuse_actors=True
-         )
-
-pass
+
+def available_memory():
+    """
+    Memory in bytes that new processes can use without swapping, None if it cannot be detected. Reads MemAvailable
+    of /proc/meminfo and falls back to the free pages, which leave out the page cache and so stay on the safe side.
+    """
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def auto_scale(cores: int, memory, envs_per_worker: int = 4):
+    """
+    Derives the rollout settings from the resources of the machine. One core is kept for the driver and the learner,
+    every other core runs a rollout worker as long as the memory suffices. Each worker steps several envs at once so
+    that the policy is evaluated on batches, and the train batch collects one fragment of every env.
+    :param cores: number of CPU cores
+    :param memory: available memory in bytes or None
+    :param envs_per_worker: number of envs per rollout worker
+    :return: dict of RLlib config entries
+    """
+    num_workers = max(1, cores - 1)
+    if memory is not None:
+        num_workers = max(1, min(num_workers, int(memory // MEMORY_PER_WORKER) - 1))
+    train_batch_size = num_workers * envs_per_worker * ROLLOUT_FRAGMENT_LENGTH
+    return {
+        "num_workers": num_workers,
+        "num_envs_per_worker": envs_per_worker,
+        "rollout_fragment_length": ROLLOUT_FRAGMENT_LENGTH,
+        "train_batch_size": train_batch_size,
+        "sgd_minibatch_size": min(4096, max(128, train_batch_size // 8)),
+    }
+
+
+class ThroughputReporter(tune.Callback):
+    """Prints the sampled env steps per second of every training iteration."""
+
+    def on_trial_result(self, iteration, trials, trial, result, **info):
+        steps = result.get("timesteps_this_iter") or 0
+        seconds = result.get("time_this_iter_s") or 0
+        sample_ms = result.get("timers", dict()).get("sample_time_ms")
+        line = f"Iteration {result.get('training_iteration')}: {steps / seconds if seconds else 0:.0f} env steps/sec"
+        if sample_ms:
+            line += f", {steps / (sample_ms / 1000):.0f} env steps/sec while sampling"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train PPO on the Mannheim grid world.")
+    parser.add_argument("--auto", action="store_true",
+                        help="use all cores: set rollout workers, envs per worker and batch size from the machine")
+    parser.add_argument("--envs-per-worker", type=int, default=4)
+    parser.add_argument("--max-iter", type=int, default=max_iter)
+    args = parser.parse_args(argv)
+
+    config = {
+        "env": "gridworld-v0",
+        "num_gpus": 0,  # 1 => with gpu
+        "seed": seed,
+        # "evaluation_interval": 2,
+        # "evaluation_duration": 10,
+        "horizon": 400,
+        "soft_horizon": False,
+        # "ignore_worker_failures": True,
+    }
+    callbacks = list()
+    if args.auto:
+        ray.init(ignore_reinit_error=True)
+        resources = ray.cluster_resources()
+        config.update(auto_scale(int(resources.get("CPU", os.cpu_count() or 1)), available_memory(),
+                                 args.envs_per_worker))
+        config["num_gpus"] = min(1, int(resources.get("GPU", 0)))
+        callbacks.append(ThroughputReporter())
+        print("Rollout configuration:", {key: config[key] for key in (
+            "num_workers", "num_envs_per_worker", "rollout_fragment_length", "train_batch_size", "num_gpus")})
+    else:
+        ray.init(local_mode=True, ignore_reinit_error=True)  # local_mode=True when no GPU is available
+
+    # run without GPU
+    print("--Start RL--")
+    tune.register_env("gridworld-v0", env_creator)
+
+    tune.run("PPO",
+             config=config,
+             local_dir=log_dir,
+             # name="OnTime-RL",
+             verbose=3,
+             stop=ray.tune.stopper.MaximumIterationStopper(args.max_iter),  # ,
+             # time_budget_s=100
+             callbacks=callbacks,
+             reuse_actors=True
+             )
+
+
+if __name__ == "__main__":
+    main()
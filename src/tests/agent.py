@@ -3,8 +3,14 @@ import numpy as np
 import time
 from IPython.display import clear_output
 
+from gridworld_gym.envs import VectorGridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+from gridworld_gym.envs.layout import OBSERVATION_INDEX, OBSERVATION_SLICES
+
 seed = 123
 np.random.seed(seed)
+# Upper edges of the delay bins of discretise
+DELAY_BINS = [0.5, 2.5, 5.5]
 
 
 class Agent:
@@ -26,60 +32,43 @@ class Agent:
         return state, reward, done, info
 
     # Train agent to find path using Reinforcement Learning
-    def train_agent(self):
-        q_table = np.zeros([5, 7, 7])
-        # Weiche x Weichenstellung x Zugpositionen
-        # Hyper-parameters
-        # Learning rate
-        alpha = 0.1
-        # Discount factor: importance to future rewards
-        gamma = 0.6
-        # Exploration rate
-        epsilon = 0.1
-
-        # For plotting metrics
-        all_epochs = []
-        all_penalties = []
-
-        for i in range(1, 100001):
-            state = self.env.reset()
-
-            epochs, penalties, reward, = 0, 0, 0
-            done = False
-
-            while not done:
-                if np.random.uniform(0, 1) < epsilon:
-                    action = self.env.action_space.sample()  # Explore action space
-                else:
-                    action = np.argmax(q_table[state])  # Exploit learned values
-
-                next_state, reward, done, info = self.env.world_step(action)
-
-                #           Q-Learning
-                old_value = q_table[state, action]
-                next_max = np.max(q_table[next_state])
-
-                new_value = (1 - alpha) * old_value + alpha * (reward + gamma * next_max)
-                q_table[state, action] = new_value
-
-                if reward == -10:
-                    penalties += 1
-
-                state = next_state
-                epochs += 1
-
-            if i % 100 == 0:
+    def train_agent(self, episodes: int = 100, num_envs: int = 64, **learner_kwargs):
+        """
+        Trains a tabular Q-learner on batches of transitions from num_envs worlds that are stepped together.
+        :param episodes: number of episodes per world
+        :param num_envs: number of worlds
+        :param learner_kwargs: hyper-parameters of TabularQLearner
+        :return: trained TabularQLearner
+        """
+        learner = TabularQLearner(**learner_kwargs)
+        env = VectorGridWorldEnv(num_envs, seed=seed)
+        state = learner.state_index(flatten(env.reset()))
+
+        for i in range(1, episodes + 1):
+            done = np.zeros(num_envs, dtype=bool)
+            episode_reward = np.zeros(num_envs)
+            while not done.any():
+                action = learner.act(state)
+                next_obs, reward, done, info = env.step(action)
+                # finished worlds are reset within step, their last observation is kept in the info
+                last_obs = info["terminal_observation"] if done.any() else next_obs
+                learner.update(state, action, reward, learner.state_index(flatten(last_obs)), done)
+                state = learner.state_index(flatten(next_obs))
+                episode_reward += reward
+
+            if i % 10 == 0:
                 clear_output(wait=True)
-                print(f"Episode: {i}")
+                print(f"Episode: {i} | Mean reward: {episode_reward.mean():.0f} | States seen: "
+                      f"{np.count_nonzero(learner.q_table.any(axis=1))}")
 
         print("Training finished.\n")
-        return q_table
+        return learner
 
     # Run agent trained using Reinforcemnt learning
-    def run_agent(self, state, q_table):
+    def run_agent(self, learner):
         epochs = 0
         penalties, reward = 0, 0
-        self.env.s = state
+        state = self.env.reset()
 
         frames = []  # for animation
         # initial state
@@ -94,9 +83,9 @@ class Agent:
 
         while not done:
             # Next action is choosen from q_table
-            action = np.argmax(q_table[state])
-            state, reward, done, info = self.env.world_step(action)
-            if reward == -10:
+            action = learner.act(learner.state_index(flatten(state)), greedy=True)[0]
+            state, reward, done, info = self.env.step(action)
+            if reward < 0:
                 penalties += 1
             # Put each rendered frame into dict for animation
             frames.append({
@@ -108,3 +97,94 @@ class Agent:
             )
             epochs += 1
         return frames, epochs, penalties
+
+
+def flatten(observation):
+    """
+    Concatenates the cluster observations of one or many worlds.
+    :param observation: dict of cluster delays as returned by GridWorldEnv or VectorGridWorldEnv
+    :return: float array of shape (worlds, 22)
+    """
+    return np.concatenate([np.atleast_2d(observation[key]) for key in OBSERVATION_SLICES], axis=1)
+
+
+def discretise(observations):
+    """
+    Bins the delays of the probe tiles: 0 no train, 1 on time or early, 2 one or two steps late, 3 up to five steps
+    late, 4 more.
+    :param observations: float array of shape (worlds, 22)
+    :return: int64 array of the same shape
+    """
+    return np.where(observations == -2, 0, 1 + np.digitize(observations, DELAY_BINS))
+
+
+class TabularQLearner:
+    """
+    Q-learning with a hashed state table. The binned delays of all probe tiles are hashed into a fixed number of
+    rows. Every row holds one Q-value per (signal cluster, cluster action), each cluster picks its action from its
+    own slice and all of them learn from the shared reward.
+    """
+
+    def __init__(self, table_size: int = 2 ** 16, alpha: float = 0.1, gamma: float = 0.6, epsilon: float = 0.1):
+        """
+        :param table_size: number of hashed states, a power of two
+        :param alpha: learning rate
+        :param gamma: discount factor: importance to future rewards
+        :param epsilon: exploration rate
+        """
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.mask = table_size - 1
+        self.rng = np.random.default_rng(seed)
+        self.multipliers = self.rng.integers(1, 2 ** 62, size=len(OBSERVATION_INDEX), dtype=np.int64) | 1
+        self.offsets = np.concatenate([[0], np.cumsum(ACTION_SIZES)[:-1]])
+        self.q_table = np.zeros((table_size, sum(ACTION_SIZES)), dtype=np.float32)
+
+    def state_index(self, observations):
+        """
+        :param observations: float array of shape (worlds, 22)
+        :return: hashed state row of every world
+        """
+        return ((discretise(observations) * self.multipliers).sum(axis=1) >> 16) & self.mask
+
+    def _cluster_values(self, states):
+        """
+        :return: list with a (worlds, actions of the cluster) array of Q-values per cluster
+        """
+        values = self.q_table[states]
+        return [values[:, offset:offset + size] for offset, size in zip(self.offsets, ACTION_SIZES)]
+
+    def act(self, states, greedy: bool = False):
+        """
+        Epsilon-greedy action of every world.
+        :param states: hashed state rows
+        :param greedy: never explore
+        :return: int array of shape (worlds, 7)
+        """
+        actions = np.stack([values.argmax(axis=1) for values in self._cluster_values(states)], axis=1)
+        if not greedy:
+            explore = self.rng.random(actions.shape) < self.epsilon
+            random_actions = (self.rng.random(actions.shape) * np.array(ACTION_SIZES)).astype(np.int64)
+            actions = np.where(explore, random_actions, actions)
+        return actions
+
+    def update(self, states, actions, rewards, next_states, dones):
+        """
+        One Q-learning update for a batch of transitions. Transitions that share a Q-value (worlds are reset into the
+        same state together) are averaged into a single step towards their mean target.
+        :param states: hashed state rows
+        :param actions: int array of shape (worlds, 7)
+        :param rewards: reward of every world
+        :param next_states: hashed state rows after the step
+        :param dones: worlds whose episode ended, their next state is not bootstrapped
+        :return: None
+        """
+        next_max = np.stack([values.max(axis=1) for values in self._cluster_values(next_states)], axis=1)
+        target = rewards[:, None] + self.gamma * next_max * ~dones[:, None]
+        columns = self.offsets + actions
+        cells = (states[:, None] * self.q_table.shape[1] + columns).ravel()
+        cells, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+        mean_target = np.bincount(inverse, weights=target.ravel()) / counts
+        q_values = self.q_table.reshape(-1)
+        q_values[cells] += self.alpha * (mean_target - q_values[cells])
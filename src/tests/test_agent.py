@@ -0,0 +1,34 @@
+"""
+Checks of the vectorized tabular Q-learner of agent.py.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+
+from agent import TabularQLearner
+
+
+def test_duplicate_transitions_make_one_step_towards_their_mean_target():
+    learner = TabularQLearner(table_size=16, alpha=0.1, gamma=0)
+    worlds = 64
+    states = np.zeros(worlds, dtype=np.int64)
+    actions = np.ones((worlds, 7), dtype=np.int64)
+    rewards = np.ones(worlds)
+    rewards[:worlds // 2] = 3
+    dones = np.zeros(worlds, dtype=bool)
+    values = list()
+    for _ in range(50):
+        learner.update(states, actions, rewards, states, dones)
+        values.append(learner.q_table[0, learner.offsets + 1].copy())
+    assert np.allclose(values[0], 0.2)
+    assert np.all(np.diff(np.array(values), axis=0) > 0)
+    assert np.allclose(values[-1], 2 * (1 - 0.9 ** 50))
+    assert np.count_nonzero(learner.q_table) == 7
+
+
+def test_distinct_transitions_are_all_applied():
+    learner = TabularQLearner(table_size=16, alpha=0.5, gamma=0)
+    states = np.array([0, 1, 2])
+    actions = np.zeros((3, 7), dtype=np.int64)
+    learner.update(states, actions, np.array([2.0, 4.0, -2.0]), states, np.zeros(3, dtype=bool))
+    assert learner.q_table[[0, 1, 2], 0].tolist() == [1.0, 2.0, -1.0]
@@ -0,0 +1,14 @@
+"""
+Checks of the argument handling of the policy evaluation.
+
+    python -m pytest src/tests
+"""
+import pytest
+
+from gridworld_gym.evaluation import evaluate, FixedCyclePolicy
+
+
+@pytest.mark.parametrize("episodes", [0, -1])
+def test_evaluate_needs_an_episode(episodes):
+    with pytest.raises(ValueError, match="episodes"):
+        evaluate(FixedCyclePolicy(), episodes=episodes, workers=1)
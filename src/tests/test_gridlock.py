@@ -0,0 +1,51 @@
+"""
+Checks of the gridlock detection of GridWorldEnv.
+
+    python -m pytest src/tests
+"""
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import LONGEST_ROUTE, ROUTES
+from gridworld_gym.evaluation import FixedCyclePolicy
+
+ROUTE = next(iter(ROUTES.values()))
+
+
+def place(env, x, y):
+    train = env.train_table.spawn(ROUTE, 1, 0)
+    env.train_table.x[train.slot], env.train_table.y[train.slot] = x, y
+    env.add_train_to_grid(x, y, train)
+    return train
+
+
+def test_lasting_cycle_is_reported_as_gridlock():
+    env = GridWorldEnv({"cycle_patience": 3})
+    env.reset(seed=0)
+    left, right = place(env, 5, 5), place(env, 6, 5)
+    for step in range(3):
+        assert env.gridlock is None
+        env._resolve_moves([(6, 5, ">", 0, left), (5, 5, "<", 0, right)])
+        env._track_gridlock(exits=1)
+    assert env.gridlock == "cycle"
+    env._resolve_moves([(5, 5, ">", 0, left), (5, 5, "<", 0, right)])
+    env._track_gridlock(exits=1)
+    assert env.gridlock is None
+
+
+def test_healthy_start_is_not_stalled_with_a_short_patience():
+    env = GridWorldEnv({"gridlock_patience": 1, "gridlock_termination": True})
+    observation, policy = env.reset(seed=0), FixedCyclePolicy()
+    while not env.exit_delays:
+        observation, _, done, info = env.step(policy(observation))
+        assert not done and info.get("gridlock") is None
+    assert env.world_step > 50
+
+
+def test_jam_before_the_first_exit_is_stalled_after_the_longest_route():
+    env = GridWorldEnv({"gridlock_patience": 5})
+    env.reset(seed=0)
+    place(env, 5, 5)
+    for step in range(LONGEST_ROUTE + 4):
+        env._track_gridlock(exits=0)
+        assert env.gridlock is None
+    env._track_gridlock(exits=0)
+    assert env.gridlock == "stalled"
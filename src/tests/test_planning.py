@@ -0,0 +1,35 @@
+"""
+Checks of the random shooting planner as a policy of the evaluation pool.
+
+    python -m pytest src/tests
+"""
+import pickle
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.evaluation import evaluate
+from gridworld_gym.planning import RandomShootingPlanner
+
+
+def small_planner(workers):
+    return RandomShootingPlanner(horizon=2, budget=0.0, batch=1, min_candidates=2, workers=workers)
+
+
+def test_pickled_planner_recreates_its_pool():
+    planner = small_planner(workers=1)
+    env = GridWorldEnv()
+    env.reset(seed=0)
+    planner.act(env)
+    copy = pickle.loads(pickle.dumps(planner))
+    assert copy._pool is None and copy.decisions == 1
+    assert len(copy.act(env)) == 7
+    assert copy.decisions == 2
+    planner.close()
+    copy.close()
+
+
+def test_evaluate_runs_a_planner_with_a_pool_in_every_worker():
+    planner = small_planner(workers=1)
+    report = evaluate(planner, episodes=2, workers=2)
+    assert report["episodes"] == 2
+    assert report["policy"]["decisions"] == planner.decisions > 0
+    assert planner._pool is None
@@ -0,0 +1,65 @@
+"""
+Checks of the per phase profiling of GridWorldEnv.step.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+from gridworld_gym.envs import GridWorldEnv
+
+ACTIONS = [(step // 3 % 3, 1, step % 2, 2, 1, step % 4, 1) for step in range(300)]
+
+
+def run(config, steps=len(ACTIONS)):
+    env = GridWorldEnv(config)
+    env.reset(seed=3)
+    results = list()
+    for action in ACTIONS[:steps]:
+        observation, reward, done, info = env.step(action)
+        info.pop("profile", None)
+        results.append((observation.tolist(), reward, done, info))
+        if done:
+            break
+    return env, results
+
+
+@pytest.mark.parametrize("config", [dict(), {"action_repeat": 4, "skip_to_decision": True},
+                                    {"gridlock_termination": True, "gridlock_patience": 60, "statistics": True}])
+def test_profiling_does_not_change_the_episode(config):
+    flat = dict(config, flat_spaces=True)
+    plain, expected = run(flat)
+    profiled, results = run(dict(flat, profile=True))
+    assert results == expected
+    if config.get("statistics"):
+        assert profiled.statistics_summary() == plain.statistics_summary()
+
+
+def test_info_holds_the_profile_only_while_profiling():
+    env = GridWorldEnv()
+    env.reset(seed=0)
+    assert "profile" not in env.step(ACTIONS[0])[3]
+    env.enable_profiling()
+    profile = env.step(ACTIONS[1])[3]["profile"]
+    assert list(profile["phases"]) == list(GridWorldEnv.PHASES)
+    assert profile["seconds"] == pytest.approx(sum(phase["seconds"] for phase in profile["phases"].values()))
+    env.enable_profiling(False)
+    assert "profile" not in env.step(ACTIONS[2])[3] and env.profile_summary() is None
+    assert np.isfinite(env.step(ACTIONS[3])[1])
+
+
+def test_repeated_world_steps_are_summed_per_step():
+    env = GridWorldEnv({"profile": True, "action_repeat": 8})
+    env.reset(seed=0)
+    total = 0.0
+    for action in ACTIONS[:5]:
+        profile = env.step(action)[3]["profile"]
+        phases = profile["phases"]
+        assert profile["world_steps"] == 8
+        assert phases["_update_world"]["calls"] == phases["_add_lines"]["calls"] == 8
+        assert phases["_update_signal"]["calls"] == phases["_convert_to_observation_space"]["calls"] == 1
+        total += phases["_update_world"]["seconds"]
+    summary = env.profile_summary()
+    assert (summary["steps"], summary["world_steps"], summary["phases"]["_update_world"]["calls"]) == (5, 40, 40)
+    assert summary["phases"]["_update_world"]["total_s"] == pytest.approx(total)
+    assert summary["world_steps_per_sec"] == pytest.approx(8 * summary["steps_per_sec"])
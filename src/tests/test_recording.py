@@ -0,0 +1,61 @@
+"""
+Checks of the episode recorder and the seed based replay.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+from gridworld_gym.envs.layout import OBSERVATION_SLICES
+from gridworld_gym.recording import Episode, EpisodeRecorder
+
+
+def observation_row(env):
+    observation = env._convert_to_observation_space()
+    if env.flat_spaces:
+        return observation
+    return np.concatenate([observation[key] for key in OBSERVATION_SLICES])
+
+
+def record(config, path):
+    recorder = EpisodeRecorder(GridWorldEnv(config), capacity=16, record_observations=True)
+    recorder.reset(seed=11)
+    rng = np.random.default_rng(0)
+    done = False
+    while not done:
+        _, _, done, _ = recorder.step([int(rng.integers(0, size)) for size in ACTION_SIZES])
+    recorder.save(path)
+    return recorder
+
+
+@pytest.mark.parametrize("config", [dict(), {"flat_spaces": True, "action_repeat": 4},
+                                    {"action_repeat": 8, "skip_to_decision": True},
+                                    {"gridlock_termination": True, "gridlock_patience": 60}])
+def test_saved_episode_replays_like_the_recording(tmp_path, config):
+    path = str(tmp_path / "episode.npz")
+    recorder = record(config, path)
+    episode = Episode.load(path)
+    assert episode.seed == 11 and len(episode) == recorder.steps and episode.dones[-1]
+    assert episode.action_repeat == config.get("action_repeat", 1)
+    for name in ("actions", "rewards", "average_delay", "dones", "observations"):
+        assert np.array_equal(getattr(episode, name), getattr(recorder.episode(), name)), name
+
+    for step in sorted({0, 1, len(episode) // 2, len(episode)}):
+        env = episode.replay(step)
+        assert np.array_equal(observation_row(env), episode.observations[step]), step
+        if step:
+            assert np.float32(env._return_average_delay()["average_delay"]) == episode.average_delay[step - 1]
+
+
+def test_diverging_replay_is_detected(tmp_path):
+    path = str(tmp_path / "episode.npz")
+    record(dict(), path)
+    episode = Episode.load(path)
+    episode.rewards[5] += 1
+    with pytest.raises(RuntimeError):
+        episode.replay()
+    episode.replay(5)
+    with pytest.raises(IndexError):
+        episode.replay(len(episode) + 1)
@@ -0,0 +1,64 @@
+"""
+Checks of the cached text and image renderer of GridWorldEnv.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+from gridworld_gym.envs.helper import Signal, Stop, Switch
+from gridworld_gym.envs.layout import GRID_HEIGHT, GRID_WIDTH
+from gridworld_gym.envs.rendering import GridRenderer, LINE_COLOURS, TILE_SIZE
+
+
+def character_output(env):
+    """The text of the original renderer that drew every tile of the grid for every frame."""
+    output = ""
+    for y, row in enumerate(env.grid):
+        for x, col in enumerate(row):
+            if env.train_grid[y][x] == 0:
+                if col == 0:
+                    output += "  "
+                elif col in ["-", "|", "/"]:
+                    output += 2 * col
+                elif col == "\\":
+                    output += col * 2
+                elif type(col) == Signal:
+                    output += "S" + str(col.status)
+                elif type(col) == Switch:
+                    output += "W" + col.status_switched
+                elif type(col) == Stop:
+                    output += "SP"
+            else:
+                output += str(env.train_grid[y][x].line_number) + env.train_grid[y][x].direction
+        output += "\n"
+    return output
+
+
+def frames(steps=300, every=7):
+    env = GridWorldEnv()
+    env.reset(seed=3)
+    rng = np.random.default_rng(0)
+    for step in range(steps):
+        env.step([int(rng.integers(0, size)) for size in ACTION_SIZES])
+        if step % every == 0:
+            yield env
+
+
+def test_cached_text_matches_the_character_output():
+    for env in frames():
+        assert env.render(mode="ansi") == character_output(env)
+    assert env.trains
+
+
+def test_rgb_frame_has_the_grid_shape_and_matches_a_fresh_renderer():
+    for env in frames(every=25):
+        image = env.render(mode="rgb_array")
+        assert image.shape == (GRID_HEIGHT * TILE_SIZE, GRID_WIDTH * TILE_SIZE, 3) and image.dtype == np.uint8
+        assert np.array_equal(image, GridRenderer(env).render_rgb())
+    (x, y), train = next(iter(env.trains.items()))
+    centre = image[y * TILE_SIZE + TILE_SIZE // 2, x * TILE_SIZE + TILE_SIZE // 2]
+    assert tuple(centre) == LINE_COLOURS[train.line_number]
+    image[:] = 0
+    assert env.render(mode="rgb_array").any()
@@ -0,0 +1,81 @@
+"""
+Checks of the move resolver of GridWorldEnv on hand-placed trains.
+
+    pip install -e gridworld-mannheim-gym
+    python -m pytest src/tests
+"""
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ROUTES
+from gridworld_gym.envs.layout import GRID_WIDTH
+
+ROUTE = next(iter(ROUTES.values()))
+
+
+def place(env, x, y):
+    train = env.train_table.spawn(ROUTE, 1, 0)
+    env.train_table.x[train.slot], env.train_table.y[train.slot] = x, y
+    env.add_train_to_grid(x, y, train)
+    return train
+
+
+def resolve(env, targets):
+    """
+    :param targets: list of (train, new x, new y) in row-major order of the trains
+    :return: trains that move in the order of execution and the number of blocked trains
+    """
+    order, blocked = env._resolve_moves([(x, y, ">", 0, train) for train, x, y in targets])
+    return [move[4] for move in order], blocked
+
+
+def make_env():
+    env = GridWorldEnv()
+    env.reset(seed=0)
+    return env
+
+
+def test_chain_moves_head_first():
+    env = make_env()
+    back, front = place(env, 5, 5), place(env, 6, 5)
+    moved, blocked = resolve(env, [(back, 6, 5), (front, 7, 5)])
+    assert moved == [front, back] and blocked == 0
+    assert env.queue_depth == 1 and env.cycles == list()
+
+
+def test_chain_behind_waiting_train_waits():
+    env = make_env()
+    back, middle, front = place(env, 4, 5), place(env, 5, 5), place(env, 6, 5)
+    moved, blocked = resolve(env, [(back, 5, 5), (middle, 6, 5), (front, 6, 5)])
+    assert moved == list() and blocked == 2
+
+
+def test_head_to_head_swap_is_a_cycle():
+    env = make_env()
+    left, right = place(env, 5, 5), place(env, 6, 5)
+    moved, blocked = resolve(env, [(left, 6, 5), (right, 5, 5)])
+    assert moved == list() and blocked == 2
+    assert len(env.cycles) == 1 and set(env.cycles[0]) == {left, right}
+
+
+def test_ring_is_a_cycle_and_blocks_a_train_behind_it():
+    env = make_env()
+    a, b, c, d = place(env, 5, 5), place(env, 6, 5), place(env, 5, 6), place(env, 6, 6)
+    behind = place(env, 5, 7)
+    # a -> b -> d -> c -> a, the train behind wants the tile d enters first
+    moved, blocked = resolve(env, [(a, 6, 5), (b, 6, 6), (c, 5, 5), (d, 5, 6), (behind, 5, 6)])
+    assert moved == list() and blocked == 5
+    assert len(env.cycles) == 1 and set(env.cycles[0]) == {a, b, c, d}
+
+
+def test_first_train_in_row_major_order_wins_a_tile():
+    env = make_env()
+    first, second = place(env, 5, 4), place(env, 4, 5)
+    moved, blocked = resolve(env, [(first, 5, 5), (second, 5, 5)])
+    assert moved == [first] and blocked == 1
+
+
+def test_train_leaving_the_grid_frees_its_tile():
+    env = make_env()
+    back, front = place(env, GRID_WIDTH - 2, 5), place(env, GRID_WIDTH - 1, 5)
+    moved, blocked = resolve(env, [(back, GRID_WIDTH - 1, 5), (front, GRID_WIDTH, 5)])
+    assert moved == [front, back] and blocked == 0
+
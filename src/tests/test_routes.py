@@ -0,0 +1,53 @@
+"""
+Checks that the precompiled routes follow the tiles like the original train movement did.
+
+    python -m pytest src/tests
+"""
+from collections import deque
+
+import pytest
+
+from gridworld_gym.envs.grid_world import ROUTES
+from gridworld_gym.envs.helper import Signal, Stop, Switch
+from gridworld_gym.envs.layout import build_grid, GRID_HEIGHT, GRID_WIDTH, LINES
+
+# Moves of the original Train.read_track: symbol -> direction -> (dx, dy, new direction)
+STRAIGHT = {"^": (0, -1, "^"), "v": (0, 1, "v"), "<": (-1, 0, "<"), ">": (1, 0, ">")}
+MOVES = {
+    "-": STRAIGHT, "|": STRAIGHT, "10": STRAIGHT, 0: STRAIGHT,
+    "/": {"<": (-1, 1, "v"), ">": (1, -1, "^"), "^": (1, -1, ">"), "v": (-1, 1, "<")},
+    "\\": {"<": (-1, -1, "^"), ">": (1, 1, "v"), "^": (-1, -1, "<"), "v": (1, 1, ">")},
+}
+
+
+def walk(start_x, start_y, direction, switches):
+    """
+    Drives a single train over a fresh grid with green signals the way the original Train did: every switch it
+    reaches takes the next symbol of the line and keeps its status once the symbols are used up.
+    :return: list of (x, y, direction) of every tile and of the first position outside of the grid
+    """
+    grid = build_grid()
+    symbols = deque(switches)
+    x, y = start_x, start_y
+    tiles = list()
+    while 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
+        tiles.append((x, y, direction))
+        symbol = grid[y][x]
+        if type(symbol) == Switch:
+            if symbols:
+                symbol.status = symbols.popleft()
+            symbol = symbol.status
+        elif type(symbol) == Signal:
+            symbol = symbol.status
+        elif type(symbol) == Stop:
+            symbol = "10"
+        dx, dy, direction = MOVES[symbol][direction]
+        x, y = x + dx, y + dy
+    tiles.append((x, y, direction))
+    return tiles
+
+
+@pytest.mark.parametrize("key", list(LINES))
+def test_route_matches_the_tile_walk(key):
+    route = [(x, y, direction) for x, y, direction, _ in ROUTES[key]]
+    assert route == walk(*LINES[key])
@@ -0,0 +1,43 @@
+"""
+Checks of the seeding of GridWorldEnv and of the block-wise draws of IntegerDraws.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES, IntegerDraws, LAST_WORLD_STEP
+
+ACTIONS = [[step % size for size in ACTION_SIZES] for step in range(LAST_WORLD_STEP + 1)]
+
+
+def episode(env, seed):
+    observation = env.reset(seed=seed)
+    results = [observation.tolist()]
+    for action in ACTIONS:
+        observation, reward, done, info = env.step(action)
+        results.append((observation.tolist(), reward, done, info["average_delay"]))
+    return results
+
+
+def test_same_seed_gives_the_same_episode():
+    first, second = GridWorldEnv({"flat_spaces": True}), GridWorldEnv({"flat_spaces": True})
+    expected = episode(first, 3)
+    assert episode(second, 3) == expected
+    assert episode(first, 3) == expected
+    assert episode(GridWorldEnv({"flat_spaces": True, "seed": 3}), None) == expected
+
+
+def test_different_seeds_give_different_episodes():
+    env = GridWorldEnv({"flat_spaces": True})
+    assert episode(env, 3) != episode(env, 4)
+
+
+def test_draws_stay_in_range_and_survive_a_restore():
+    draws = IntegerDraws(np.random.default_rng(0), -3, 3, block=16)
+    values = [next(draws) for _ in range(40)]
+    assert min(values) == -3 and max(values) == 3
+    state = draws.get_state()
+    ahead = [next(draws) for _ in range(len(state))]
+    draws.set_state(state)
+    assert [next(draws) for _ in range(len(state))] == ahead
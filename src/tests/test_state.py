@@ -0,0 +1,59 @@
+"""
+Checks of the snapshots of GridWorldEnv (get_state, set_state and clone).
+
+    python -m pytest src/tests
+"""
+import pickle
+
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES
+
+CONFIG = {"flat_spaces": True}
+
+
+def actions(seed, steps):
+    rng = np.random.default_rng(seed)
+    return [[int(rng.integers(0, size)) for size in ACTION_SIZES] for _ in range(steps)]
+
+
+def play(env, plan):
+    results = list()
+    for action in plan:
+        observation, reward, done, info = env.step(action)
+        results.append((observation.tolist(), reward, done, info["average_delay"]))
+    # the next draws of the generator have to match too
+    results.append(env.np_random.integers(0, 2 ** 32, size=4).tolist())
+    return results
+
+
+def test_restored_snapshot_reproduces_the_trajectory():
+    env = GridWorldEnv(CONFIG)
+    env.reset(seed=7)
+    play(env, actions(0, 150))
+    state = env.get_state()
+    plan = actions(1, 200)
+    expected = play(env, plan)
+    assert env.set_state(state).tolist() == GridWorldEnv(CONFIG).set_state(state).tolist()
+    assert play(env, plan) == expected
+
+    other = GridWorldEnv(CONFIG)
+    other.reset(seed=99)
+    other.set_state(pickle.loads(pickle.dumps(state)))
+    assert play(other, plan) == expected
+
+
+def test_mutating_a_clone_leaves_the_original_unchanged():
+    env = GridWorldEnv(CONFIG)
+    env.reset(seed=7)
+    play(env, actions(0, 150))
+    state = env.get_state()
+    clone = env.clone()
+    assert clone.get_state() == state
+    play(clone, actions(2, 100))
+    assert clone.get_state() != state
+    assert env.get_state() == state
+
+    plan = actions(1, 50)
+    assert play(env.clone(), plan) == play(env, plan)
@@ -0,0 +1,80 @@
+"""
+Checks of the streaming punctuality statistics.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+from gridworld_gym.envs import GridWorldEnv
+from gridworld_gym.envs.statistics import DelayStats, Histogram, PunctualityStats, RunningStats
+
+
+def test_running_stats_match_numpy_and_merge():
+    values = np.random.default_rng(0).normal(10, 4, 1000)
+    left, right, total = RunningStats(), RunningStats(), RunningStats()
+    for index, value in enumerate(values):
+        (left if index < 300 else right).add(value)
+        total.add(value)
+    left.merge(right)
+    for stats in (left, total):
+        assert stats.count == len(values)
+        assert stats.mean == pytest.approx(values.mean())
+        assert stats.variance == pytest.approx(values.var())
+        assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_histogram_quantiles_lie_within_one_bin():
+    values = np.random.default_rng(1).integers(-3, 60, 5000)
+    histogram = Histogram()
+    for value in values:
+        histogram.add(int(value))
+    for quantile in (0.5, 0.9, 0.99):
+        assert abs(histogram.quantile(quantile) - np.percentile(values, quantile * 100)) <= 5
+    assert Histogram().quantile(0.5) is None
+
+
+def test_values_outside_the_edges_are_clamped():
+    histogram = Histogram(edges=(0, 10))
+    for value in (-5, -5, 20):
+        histogram.add(value)
+    assert histogram.counts == [2, 0, 1]
+    assert histogram.quantile(0.1) == 0.0 and histogram.quantile(1.0) == 10.0
+
+
+def test_punctuality_per_line_and_station():
+    stats = PunctualityStats(on_time=3)
+    for delay in (0, 3, 4, 10):
+        stats.arrival(1, "Tattersall", delay)
+    stats.arrival(4, "Tattersall", 1)
+    stats.departure(1, "Tattersall", 2)
+    stats.exit(1, 12)
+    summary = stats.summary()
+    line = summary["lines"][1]
+    assert line["arrivals"] == 4 and line["punctuality"] == 0.5
+    assert line["stations"]["Tattersall"]["dwell_delay"]["mean"] == 2
+    assert line["exit_delay"]["count"] == 1
+    assert summary["stations"]["Tattersall"]["arrivals"] == 5
+    assert summary["network"]["punctuality"] == 0.6
+
+    other = PunctualityStats(on_time=3)
+    other.merge(stats)
+    other.merge(stats)
+    assert other.summary()["network"]["arrivals"] == 10 and other.punctual[(1, "Tattersall")] == 4
+
+
+def test_env_collects_statistics_over_episodes():
+    env = GridWorldEnv({"statistics": True})
+    arrivals = list()
+    for seed in (0, 1):
+        env.reset(seed=seed)
+        done = False
+        while not done:
+            _, _, done, _ = env.step([1, 1, 1, 1, 1, 1, 1])
+        arrivals.append(env.statistics_summary()["network"]["arrivals"])
+    assert 0 < arrivals[0] < arrivals[1]
+    assert GridWorldEnv().statistics_summary() is None
+
+
+def test_delay_stats_summary_without_values():
+    assert DelayStats().summary() == {"count": 0}
@@ -0,0 +1,74 @@
+"""
+Checks of the shared-memory vector env that steps GridWorldEnv instances in worker processes.
+
+    python -m pytest src/tests
+"""
+import numpy as np
+import pytest
+
+from gridworld_gym.envs import GridWorldEnv, SubprocVectorGridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES, LAST_WORLD_STEP
+from gridworld_gym.envs.layout import OBSERVATION_SLICES
+from gridworld_gym.envs.subproc_vector_env import rllib_vector_env
+
+NUM_ENVS = 4
+
+
+def flat(observation):
+    if isinstance(observation, np.ndarray):
+        return observation
+    return np.concatenate([observation[key] for key in OBSERVATION_SLICES], axis=-1)
+
+
+def random_actions(rng):
+    return np.stack([rng.integers(0, size, NUM_ENVS) for size in ACTION_SIZES], axis=1)
+
+
+@pytest.mark.parametrize("config", [dict(), {"flat_spaces": True}])
+def test_workers_step_like_envs_in_process(config):
+    vector = SubprocVectorGridWorldEnv(NUM_ENVS, num_workers=2, config=config, seed=5)
+    envs = [GridWorldEnv(config) for _ in range(NUM_ENVS)]
+    try:
+        observations = vector.reset()
+        expected = [env.reset(seed=5 + index) for index, env in enumerate(envs)]
+        rng = np.random.default_rng(0)
+        resets = 0
+        for step in range(LAST_WORLD_STEP + 2):
+            assert np.array_equal(flat(observations), np.stack([flat(observation) for observation in expected])), step
+            actions = random_actions(rng)
+            observations, rewards, dones, info = vector.step(actions)
+            expected = list()
+            for index, env in enumerate(envs):
+                observation, reward, done, env_info = env.step(actions[index])
+                assert (rewards[index], dones[index]) == (reward, done), (step, index)
+                assert info["average_delay"][index] == env_info["average_delay"], (step, index)
+                if done:
+                    assert np.array_equal(flat(info["terminal_observation"])[index], flat(observation))
+                    observation = env.reset()
+                    resets += 1
+                expected.append(observation)
+        assert resets == NUM_ENVS
+    finally:
+        vector.close()
+
+
+def test_close_stops_the_workers():
+    vector = SubprocVectorGridWorldEnv(NUM_ENVS, num_workers=2, seed=0)
+    vector.reset()
+    vector.step(random_actions(np.random.default_rng(0)))
+    vector.close()
+    assert vector.closed and not any(process.is_alive() for process in vector.processes)
+    vector.close()
+
+
+def test_rllib_vector_env_resets_single_envs():
+    pytest.importorskip("ray")
+    env = rllib_vector_env({"num_envs": NUM_ENVS, "num_workers": 2, "seed": 0, "flat_spaces": True})
+    try:
+        observations = env.vector_reset()
+        assert len(observations) == NUM_ENVS
+        observations, rewards, dones, infos = env.vector_step(random_actions(np.random.default_rng(0)))
+        assert len(rewards) == len(dones) == len(infos) == NUM_ENVS
+        assert env.reset_at(2).shape == observations[2].shape
+    finally:
+        env.env.close()
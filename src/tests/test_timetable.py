@@ -0,0 +1,47 @@
+"""
+Checks of the departure scheduler.
+
+    python -m pytest src/tests
+"""
+import pytest
+
+from gridworld_gym.envs.timetable import Departure, Timetable
+
+
+def due_steps(timetable, steps):
+    return [(step, departure.line) for step in range(steps) for departure in timetable.due(step)]
+
+
+def test_departures_follow_offset_and_headway():
+    timetable = Timetable([(1, False, 2, 5), (4, True, 0, 3)])
+    assert due_steps(timetable, 10) == [(0, 4), (2, 1), (3, 4), (6, 4), (7, 1), (9, 4)]
+
+
+def test_departures_due_at_the_same_step_keep_their_order():
+    timetable = Timetable([Departure(6, False, 1, 20), Departure(4, False, 1, 20), Departure(5, True, 1, 20)])
+    assert [departure.line for departure in timetable.due(1)] == [6, 4, 5]
+
+
+def test_missed_departures_are_caught_up():
+    timetable = Timetable([(1, False, 0, 2)])
+    assert len(list(timetable.due(5))) == 3
+
+
+def test_reset_and_state_restore_the_schedule():
+    timetable = Timetable([(1, False, 0, 2), (2, True, 1, 3)])
+    expected = due_steps(timetable, 20)
+    timetable.reset()
+    assert due_steps(timetable, 20) == expected
+
+    timetable.reset()
+    due_steps(timetable, 7)
+    state = timetable.get_state()
+    rest = [(step, departure.line) for step in range(7, 20) for departure in timetable.due(step)]
+    timetable.set_state(state)
+    assert [(step, departure.line) for step in range(7, 20) for departure in timetable.due(step)] == rest
+
+
+@pytest.mark.parametrize("departure", [(1, False, 0, 0), (1, False, -1, 5)])
+def test_invalid_departures_are_rejected(departure):
+    with pytest.raises(ValueError):
+        Timetable([departure])
@@ -0,0 +1,75 @@
+"""
+Checks of the incremental loader for Ray Tune experiment directories.
+
+    python -m pytest src/tests
+"""
+import json
+
+import numpy as np
+
+from gridworld_gym.tune_logs import Column, ExperimentLog, TrialLog
+
+
+def write(path, text, mode="a"):
+    with open(path, mode) as file:
+        file.write(text)
+
+
+def make_trial(root, name, rows, params=None):
+    trial = root / name
+    trial.mkdir()
+    write(trial / "progress.csv", "training_iteration,episode_reward_mean,done\n" + rows, "w")
+    if params is not None:
+        write(trial / "params.json", json.dumps(params), "w")
+    return trial
+
+
+def test_poll_reads_only_complete_new_rows(tmp_path):
+    path = make_trial(tmp_path, "trial", "1,-5.0,False\n2,-3.")
+    trial = TrialLog(str(path))
+    assert trial.poll() == 1
+    assert trial.poll() == 0
+    write(path / "progress.csv", "5,False\n3,,True\n")
+    assert trial.poll() == 2
+    assert np.array_equal(trial.column("episode_reward_mean"), [-5.0, -3.5, np.nan], equal_nan=True)
+    assert trial.column("done").tolist() == [0.0, 0.0, 1.0]
+
+
+def test_rewritten_file_is_read_from_the_start(tmp_path):
+    path = make_trial(tmp_path, "trial", "1,-5.0,False\n2,-3.0,False\n")
+    trial = TrialLog(str(path))
+    trial.poll()
+    write(path / "progress.csv", "training_iteration,episode_reward_mean,done\n1,7.0,False\n", "w")
+    assert trial.poll() == 1
+    assert trial.column("episode_reward_mean").tolist() == [7.0]
+
+
+def test_columns_are_selected_lazily(tmp_path):
+    path = make_trial(tmp_path, "trial", "1,-5.0,False\n2,-3.0,False\n")
+    trial = TrialLog(str(path), columns=["training_iteration"])
+    trial.poll()
+    assert list(trial.columns) == ["training_iteration"]
+    assert trial.column("episode_reward_mean").tolist() == [-5.0, -3.0]
+    write(path / "progress.csv", "3,-1.0,True\n")
+    trial.poll()
+    assert trial.column("episode_reward_mean").tolist() == [-5.0, -3.0, -1.0]
+    assert np.isnan(trial.column("missing")).all()
+
+
+def test_numeric_column_turning_into_text_keeps_plain_numbers():
+    column = Column(capacity=1)
+    column.extend(["1", "", "2.5"])
+    column.extend(["done"])
+    assert column.data() == ["1.0", "", "2.5", "done"]
+
+
+def test_experiment_finds_trials_and_the_best_one(tmp_path):
+    make_trial(tmp_path, "first", "1,-5.0,False\n2,4.0,False\n", params={"lr": 0.1})
+    experiment = ExperimentLog(str(tmp_path), columns=["training_iteration"])
+    assert experiment.poll() == {"first": 2}
+    make_trial(tmp_path, "second", "1,1.0,False\n2,2.0,False\n")
+    assert experiment.poll() == {"first": 0, "second": 2}
+    assert experiment.last("episode_reward_mean") == {"first": 4.0, "second": 2.0}
+    assert experiment.best() == "first" and experiment.best(mode="min") == "first"
+    assert experiment.trials[str(tmp_path / "first")].params == {"lr": 0.1}
+    assert experiment.trials[str(tmp_path / "second")].params == dict()
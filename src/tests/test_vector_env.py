@@ -0,0 +1,45 @@
+"""
+Checks that the batched engine of VectorGridWorldEnv steps like GridWorldEnv.
+
+    python -m pytest src/tests
+"""
+import itertools
+
+import numpy as np
+
+from gridworld_gym.envs import GridWorldEnv, VectorGridWorldEnv
+from gridworld_gym.envs.grid_world import ACTION_SIZES, LAST_WORLD_STEP
+from gridworld_gym.envs.layout import OBSERVATION_SLICES
+
+
+class ZeroDraws:
+    """Generator without randomness, both engines draw start delays and dwell times differently."""
+
+    @staticmethod
+    def integers(low, high, size=None, dtype=np.int64):
+        return np.zeros(size, dtype=dtype)
+
+
+def test_batched_engine_matches_scalar_envs():
+    num_envs = 4
+    vector = VectorGridWorldEnv(num_envs)
+    vector.np_random = ZeroDraws()
+    scalars = [GridWorldEnv() for _ in range(num_envs)]
+    for env in scalars:
+        env.reset(seed=0)
+        env.start_delays = env.dwell_times = itertools.repeat(0)
+    observation = vector.reset()
+    rng = np.random.default_rng(0)
+    for step in range(LAST_WORLD_STEP + 1):
+        actions = np.stack([rng.integers(0, size, num_envs) for size in ACTION_SIZES], axis=1)
+        observation, rewards, dones, info = vector.step(actions)
+        if dones.any():
+            observation = info["terminal_observation"]
+        for index, env in enumerate(scalars):
+            scalar_observation, reward, done, scalar_info = env.step(actions[index])
+            for key in OBSERVATION_SLICES:
+                assert np.array_equal(observation[key][index], scalar_observation[key]), (step, index, key)
+            assert rewards[index] == reward, (step, index)
+            assert dones[index] == done, (step, index)
+            assert np.isclose(info["average_delay"][index], scalar_info["average_delay"]), (step, index)
+    assert dones.all()